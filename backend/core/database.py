@@ -0,0 +1,31 @@
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import DeclarativeBase, sessionmaker, Session
+from typing import Optional
+from .config import settings
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+
+
+def get_engine() -> Engine:
+    """Create the engine on first use so importing models never needs a database"""
+    global _engine, _session_factory
+    if _engine is None:
+        connect_args = {}
+        if settings.DATABASE_URL.startswith("sqlite"):
+            # Sessions are used from worker threads via asyncio.to_thread
+            connect_args["check_same_thread"] = False
+        _engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True, connect_args=connect_args)
+        _session_factory = sessionmaker(bind=_engine, expire_on_commit=False)
+    return _engine
+
+
+def get_session() -> Session:
+    get_engine()
+    return _session_factory()
\ No newline at end of file
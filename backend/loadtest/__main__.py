@@ -0,0 +1,134 @@
+"""Load-test the SoF API against a stubbed OpenRouter upstream.
+
+    python -m backend.loadtest                               # default profile
+    python -m backend.loadtest --profile my.json --duration 120 --output report.json
+    python -m backend.loadtest --target-url http://staging:8000 --server-pid 1234
+
+Exits with status 1 when any profile threshold is violated, so the run can
+gate a CI job.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, Optional
+from .runner import LoadRunner, AppServer, RssSampler, check_thresholds
+from .stubs import StubOpenRouter, UpstreamProfile
+
+DEFAULT_PROFILE = Path(__file__).parent / "profiles" / "default.json"
+
+
+async def run_profile(profile: Dict[str, Any], target_url: Optional[str] = None, server_pid: Optional[int] = None) -> Dict[str, Any]:
+    upstreams = profile.get("upstreams", {})
+    openrouter = StubOpenRouter(UpstreamProfile.from_dict(upstreams.get("openrouter")))
+    server = None
+    sampler = None
+
+    with tempfile.TemporaryDirectory(prefix="maritime-loadtest-") as workdir:
+        await openrouter.start()
+        print(f"Stub OpenRouter: {openrouter.base_url}")
+        try:
+            if target_url is None:
+                for name in ("uploads", "exports", "llm-cache"):
+                    os.makedirs(os.path.join(workdir, name))
+                env = {
+                    "OPENROUTER_API_KEY": "loadtest",
+                    "OPENROUTER_BASE_URL": openrouter.base_url,
+                    "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'loadtest.db')}",
+                    "SOF_STORE_ENABLED": "true",
+                    "UPLOAD_DIR": os.path.join(workdir, "uploads"),
+                    "EXPORT_DIR": os.path.join(workdir, "exports"),
+                    "LLM_CACHE_DIR": os.path.join(workdir, "llm-cache"),
+                    **{k: str(v) for k, v in profile.get("app_env", {}).items()}
+                }
+                server = AppServer(profile.get("app", "backend.loadtest.app:app"), profile.get("workers", 1), env)
+                await server.start()
+                target_url = server.url
+                server_pid = server.process.pid
+
+            if server_pid:
+                sampler = RssSampler(server_pid)
+                sampler.start()
+
+            runner = LoadRunner(
+                target_url + profile.get("api_prefix", "/api"),
+                profile["scenarios"],
+                profile.get("max_in_flight", 256),
+                profile.get("request_timeout_seconds", 120)
+            )
+            elapsed = await runner.run(profile.get("duration_seconds", 60), profile.get("warmup_seconds", 0))
+        finally:
+            if sampler is not None:
+                await sampler.stop()
+            if server is not None:
+                server.stop()
+            await openrouter.stop()
+
+    endpoints = runner.summary(elapsed)
+    rss = sampler.summary() if sampler is not None else {"available": False}
+    return {
+        "duration_seconds": round(elapsed, 2),
+        "endpoints": endpoints,
+        "rss": rss,
+        "upstreams": {"openrouter": openrouter.stats()},
+        "violations": check_thresholds(endpoints, rss, profile.get("thresholds", {}))
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    columns = ("requests", "throughput_rps", "p50_ms", "p95_ms", "p99_ms", "error_rate", "rejected_rate", "dropped")
+    print(f"{'endpoint':<26}" + "".join(f"{c:>15}" for c in columns))
+    for name, summary in report["endpoints"].items():
+        print(f"{name:<26}" + "".join(f"{summary[c]:>15}" for c in columns))
+
+    rss = report["rss"]
+    if rss.get("available"):
+        print(
+            f"\nRSS: peak total {rss['peak_total_mb']} MB, mean total {rss['mean_total_mb']} MB, "
+            f"peak worker {rss['peak_worker_mb']} MB across {rss['processes']} processes"
+        )
+    for name, stats in report["upstreams"].items():
+        print(f"Stub {name}: {stats['requests']} requests, {stats['injected_failures']} injected failures")
+
+    if report["violations"]:
+        print("\nTHRESHOLD VIOLATIONS:")
+        for violation in report["violations"]:
+            print(f"  - {violation}")
+    else:
+        print("\nAll thresholds passed")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend.loadtest", description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", default=str(DEFAULT_PROFILE), help="Load profile JSON")
+    parser.add_argument("--duration", type=float, help="Override measured duration in seconds")
+    parser.add_argument("--rate-scale", type=float, default=1.0, help="Multiply every scenario's rate")
+    parser.add_argument("--workers", type=int, help="Override uvicorn worker count")
+    parser.add_argument("--target-url", help="Load an already running server instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="PID of the external server, for RSS sampling")
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args(argv)
+
+    with open(args.profile, encoding="utf-8") as f:
+        profile = json.load(f)
+    if args.duration is not None:
+        profile["duration_seconds"] = args.duration
+    if args.workers is not None:
+        profile["workers"] = args.workers
+    for scenario in profile["scenarios"]:
+        scenario["rate"] = float(scenario["rate"]) * args.rate_scale
+
+    report = asyncio.run(run_profile(profile, args.target_url, args.server_pid))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    return 1 if report["violations"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,15 @@
+"""ASGI app for load tests: the real SoF router mounted where the frontend expects it.
+
+The weather router is not mounted; its WeatherService module is not part
+of this backend yet.
+"""
+import os
+from fastapi import FastAPI
+from ..core.config import settings
+from ..routers import sof
+
+for directory in (settings.UPLOAD_DIR, settings.EXPORT_DIR):
+    os.makedirs(directory, exist_ok=True)
+
+app = FastAPI(title="Maritime API (load test)")
+app.include_router(sof.router, prefix="/api/sof", tags=["sof"])
\ No newline at end of file
@@ -0,0 +1,289 @@
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, Any, List, Optional
+import aiohttp
+import numpy as np
+from .scenarios import SCENARIOS
+
+
+class EndpointStats:
+    """Outcomes for one scenario; latencies are kept raw for exact percentiles"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies_ms: List[float] = []
+        self.statuses: Dict[int, int] = {}
+        self.errors = 0
+        self.rejected = 0
+        self.exceptions = 0
+        self.dropped = 0
+        self.bytes_received = 0
+
+    def record(self, status: int, latency_ms: float, received: int):
+        self.latencies_ms.append(latency_ms)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.bytes_received += received
+        if status == 429:
+            self.rejected += 1
+        elif status >= 400:
+            self.errors += 1
+
+    def record_exception(self, latency_ms: float):
+        self.latencies_ms.append(latency_ms)
+        self.exceptions += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        completed = len(self.latencies_ms)
+        failed = self.errors + self.exceptions
+        latencies = np.array(self.latencies_ms) if completed else np.array([0.0])
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        return {
+            "requests": completed,
+            "throughput_rps": round(completed / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(float(p50), 1),
+            "p95_ms": round(float(p95), 1),
+            "p99_ms": round(float(p99), 1),
+            "max_ms": round(float(latencies.max()), 1),
+            "error_rate": round(failed / completed, 4) if completed else 0.0,
+            "rejected_rate": round(self.rejected / completed, 4) if completed else 0.0,
+            "exceptions": self.exceptions,
+            "dropped": self.dropped,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "bytes_received": self.bytes_received
+        }
+
+
+class RssSampler:
+    """Samples resident memory of a server process and its workers from /proc (Linux)"""
+
+    def __init__(self, root_pid: int, interval: float = 0.5):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.totals_mb: List[float] = []
+        self.peak_by_pid: Dict[int, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def sample(self):
+        total = 0.0
+        for pid in self._process_tree(self.root_pid):
+            rss = self._rss_mb(pid)
+            if rss is None:
+                continue
+            total += rss
+            self.peak_by_pid[pid] = max(self.peak_by_pid.get(pid, 0.0), rss)
+        if total:
+            self.totals_mb.append(total)
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.totals_mb:
+            return {"available": False}
+        return {
+            "available": True,
+            "peak_total_mb": round(max(self.totals_mb), 1),
+            "mean_total_mb": round(sum(self.totals_mb) / len(self.totals_mb), 1),
+            "peak_worker_mb": round(max(self.peak_by_pid.values()), 1),
+            "processes": len(self.peak_by_pid),
+            "samples": len(self.totals_mb)
+        }
+
+    @staticmethod
+    def _rss_mb(pid: int) -> Optional[float]:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            return None
+        return None
+
+    @staticmethod
+    def _process_tree(root_pid: int) -> List[int]:
+        pids, pending = [], [root_pid]
+        while pending:
+            pid = pending.pop()
+            pids.append(pid)
+            try:
+                for task in os.listdir(f"/proc/{pid}/task"):
+                    with open(f"/proc/{pid}/task/{task}/children") as f:
+                        pending.extend(int(child) for child in f.read().split())
+            except OSError:
+                continue
+        return pids
+
+
+class LoadRunner:
+    """Open-loop load: each scenario fires Poisson arrivals at its target rate.
+
+    Arrivals do not wait for earlier responses, so a slow server shows up as
+    latency and errors rather than a silently reduced request rate. Requests
+    beyond max_in_flight are counted as dropped instead of being sent.
+    """
+
+    def __init__(self, base_url: str, scenarios: List[Dict[str, Any]], max_in_flight: int = 256, timeout: float = 120):
+        for scenario in scenarios:
+            if scenario["type"] not in SCENARIOS:
+                raise ValueError(f"Unknown scenario type: {scenario['type']}")
+        self.base_url = base_url.rstrip("/")
+        self.scenarios = scenarios
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.stats = {s["name"]: EndpointStats(s["name"]) for s in scenarios}
+        self._in_flight = 0
+
+    async def run(self, duration: float, warmup: float = 0) -> float:
+        """Drive load for warmup + duration seconds; only the measured window is recorded"""
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            if warmup:
+                await self._drive(session, warmup, record=False)
+            started = time.monotonic()
+            await self._drive(session, duration, record=True)
+            return time.monotonic() - started
+
+    async def _drive(self, session: aiohttp.ClientSession, duration: float, record: bool):
+        tasks: List[asyncio.Task] = []
+        deadline = time.monotonic() + duration
+        await asyncio.gather(*(
+            self._arrivals(session, scenario, deadline, record, tasks) for scenario in self.scenarios
+        ))
+        # Requests already sent are allowed to finish and are counted
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def _arrivals(self, session, scenario: Dict[str, Any], deadline: float, record: bool, tasks: List):
+        rate = float(scenario["rate"])
+        if rate <= 0:
+            return
+        next_at = time.monotonic() + random.expovariate(rate)
+        while next_at < deadline:
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+            if self._in_flight >= self.max_in_flight:
+                if record:
+                    self.stats[scenario["name"]].dropped += 1
+            else:
+                self._in_flight += 1
+                tasks.append(asyncio.create_task(self._send(session, scenario, record)))
+            next_at += random.expovariate(rate)
+
+    async def _send(self, session: aiohttp.ClientSession, scenario: Dict[str, Any], record: bool):
+        send = SCENARIOS[scenario["type"]]
+        started = time.perf_counter()
+        try:
+            status, received = await send(session, self.base_url, scenario.get("params", {}))
+            if record:
+                self.stats[scenario["name"]].record(status, (time.perf_counter() - started) * 1000, received)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if record:
+                self.stats[scenario["name"]].record_exception((time.perf_counter() - started) * 1000)
+        finally:
+            self._in_flight -= 1
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, Any]]:
+        return {name: stats.summary(elapsed) for name, stats in self.stats.items()}
+
+
+class AppServer:
+    """Runs the FastAPI app under uvicorn in a subprocess with overridden settings"""
+
+    def __init__(self, app: str, workers: int = 1, env: Optional[Dict[str, str]] = None, port: Optional[int] = None):
+        self.app = app
+        self.workers = workers
+        self.env = env or {}
+        self.port = port or _free_port()
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self, ready_timeout: float = 60):
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", self.app,
+                "--host", "127.0.0.1", "--port", str(self.port),
+                "--workers", str(self.workers), "--no-access-log"
+            ],
+            env={**os.environ, **self.env}
+        )
+        await self._wait_ready(ready_timeout)
+
+    async def _wait_ready(self, ready_timeout: float):
+        deadline = time.monotonic() + ready_timeout
+        async with aiohttp.ClientSession() as session:
+            while time.monotonic() < deadline:
+                if self.process.poll() is not None:
+                    raise Exception(f"App server exited during startup (code {self.process.returncode})")
+                try:
+                    # Any HTTP response, even a 404, means the server is accepting requests
+                    async with session.get(self.url, timeout=aiohttp.ClientTimeout(total=2)):
+                        return
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    await asyncio.sleep(0.25)
+        raise Exception(f"App server not ready after {ready_timeout}s")
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def check_thresholds(endpoints: Dict[str, Dict[str, Any]], rss: Dict[str, Any], thresholds: Dict[str, Any]) -> List[str]:
+    """Compare a run against limits; returns human-readable violations.
+
+    thresholds = {
+        "endpoints": {"sof_upload": {"p95_ms": 8000, "error_rate": 0.02}, "*": {...}},
+        "rss": {"peak_total_mb": 2048, "peak_worker_mb": 1024}
+    }
+    Endpoint limits are maxima except min_throughput_rps; "*" applies to
+    every endpoint without its own entry.
+    """
+    violations = []
+    endpoint_limits = thresholds.get("endpoints", {})
+    for name, summary in endpoints.items():
+        limits = endpoint_limits.get(name, endpoint_limits.get("*", {}))
+        for metric, limit in limits.items():
+            if metric == "min_throughput_rps":
+                if summary["throughput_rps"] < limit:
+                    violations.append(f"{name}: throughput {summary['throughput_rps']} rps < {limit}")
+            elif metric not in summary:
+                violations.append(f"{name}: unknown threshold metric '{metric}'")
+            elif summary[metric] > limit:
+                violations.append(f"{name}: {metric} {summary[metric]} > {limit}")
+
+    if rss.get("available"):
+        for metric, limit in thresholds.get("rss", {}).items():
+            if rss.get(metric, 0) > limit:
+                violations.append(f"rss: {metric} {rss[metric]} MB > {limit} MB")
+    return violations
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
\ No newline at end of file
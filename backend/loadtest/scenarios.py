@@ -0,0 +1,134 @@
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Tuple, Callable, Awaitable
+import aiohttp
+
+# A scenario sends one request and returns (status, response bytes read)
+Scenario = Callable[[aiohttp.ClientSession, str, Dict[str, Any]], Awaitable[Tuple[int, int]]]
+
+
+def sof_lines(event_count: int) -> List[str]:
+    """Statement of Facts text lines; a unique reference keeps LLM cache hits realistic"""
+    start = datetime(2024, 3, 1, 6, 0) + timedelta(minutes=random.randint(0, 60 * 24 * 30))
+    lines = [
+        "STATEMENT OF FACTS",
+        f"Vessel: MV LOADTEST {random.randint(1, 999)}    Ref: {uuid.uuid4()}",
+        "Port: SINGAPORE    Cargo: 45,000 MT COAL",
+    ]
+    activities = [
+        "Vessel arrived at anchorage", "Notice of readiness tendered", "Pilot on board",
+        "All fast at berth", "Commenced loading", "Stopped loading due to rain",
+        "Resumed loading", "Completed loading", "Documents on board", "Vessel sailed"
+    ]
+    for i in range(event_count):
+        at = start + timedelta(minutes=45 * i)
+        lines.append(f"{at:%d/%m/%Y}  {at:%H%M} hrs  {activities[i % len(activities)]}")
+    return lines
+
+
+def build_pdf(lines: List[str]) -> bytes:
+    """Minimal single-font PDF with a real text layer, so PyPDF2 extracts it without OCR"""
+    def escape(text: str) -> str:
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    per_page = 48
+    pages = [lines[i:i + per_page] for i in range(0, len(lines), per_page)] or [[]]
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    font_id = 3
+
+    objects = {
+        1: "<< /Type /Catalog /Pages 2 0 R >>",
+        2: "<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{p} 0 R" for p in page_ids), len(pages)),
+        font_id: "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    for page_id, page_lines in zip(page_ids, pages):
+        text = "".join(f"({escape(line)}) Tj T* " for line in page_lines)
+        stream = f"BT /F1 10 Tf 14 TL 50 760 Td {text}ET"
+        objects[page_id] = (
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {page_id + 1} 0 R >>"
+        )
+        objects[page_id + 1] = f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(out)
+        out += f"{obj_id} 0 obj\n{objects[obj_id]}\nendobj\n".encode("latin-1")
+
+    xref_at = len(out)
+    size = max(objects) + 1
+    out += f"xref\n0 {size}\n0000000000 65535 f \n".encode("ascii")
+    for obj_id in range(1, size):
+        out += f"{offsets[obj_id]:010d} 00000 n \n".encode("ascii")
+    out += f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n".encode("ascii")
+    return bytes(out)
+
+
+def _upload_form(params: Dict[str, Any]) -> aiohttp.FormData:
+    form = aiohttp.FormData()
+    form.add_field(
+        "file",
+        build_pdf(sof_lines(params.get("events", 30))),
+        filename="loadtest_sof.pdf",
+        content_type="application/pdf"
+    )
+    form.add_field("mode", params.get("mode", "accuracy"))
+    form.add_field("enable_ocr", str(params.get("enable_ocr", False)).lower())
+    if params.get("pages"):
+        form.add_field("pages", params["pages"])
+    if params.get("auto_pages"):
+        form.add_field("auto_pages", "true")
+    return form
+
+
+async def sof_upload(session: aiohttp.ClientSession, base_url: str, params: Dict[str, Any]) -> Tuple[int, int]:
+    """A 200 whose result could not be stored counts as a failure when persisting"""
+    persist = params.get("persist", True)
+    form = _upload_form(params)
+    form.add_field("persist", str(persist).lower())
+    async with session.post(f"{base_url}/sof/process", data=form) as response:
+        body = await response.read()
+        if persist and response.status == 200 and b'"storage_error"' in body:
+            return 500, len(body)
+        return response.status, len(body)
+
+
+async def sof_stream(session: aiohttp.ClientSession, base_url: str, params: Dict[str, Any]) -> Tuple[int, int]:
+    """Reads the whole SSE stream; an in-stream error event counts as a failure"""
+    async with session.post(f"{base_url}/sof/process-stream", data=_upload_form(params)) as response:
+        received = 0
+        failed = False
+        async for line in response.content:
+            received += len(line)
+            if line.startswith(b"event: error"):
+                failed = True
+        return (502 if failed else response.status), received
+
+
+async def sof_export(session: aiohttp.ClientSession, base_url: str, params: Dict[str, Any]) -> Tuple[int, int]:
+    start = datetime(2024, 3, 1, 6, 0)
+    events = [
+        {
+            "event_name": f"Loading hold {i % 7 + 1}",
+            "start_time_iso": f"{start + timedelta(hours=i):%Y-%m-%dT%H:%M:%S}Z",
+            "end_time_iso": f"{start + timedelta(hours=i, minutes=50):%Y-%m-%dT%H:%M:%S}Z",
+            "duration_minutes": 50,
+            "page": 1,
+            "row_index": i + 1,
+            "confidence": 0.9
+        }
+        for i in range(params.get("events", 200))
+    ]
+    query = {"format": params.get("format", "csv"), "filename": f"loadtest_{uuid.uuid4().hex}"}
+    async with session.post(f"{base_url}/sof/export", params=query, json=events) as response:
+        body = await response.read()
+        return response.status, len(body)
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "sof_upload": sof_upload,
+    "sof_stream": sof_stream,
+    "sof_export": sof_export,
+}
\ No newline at end of file
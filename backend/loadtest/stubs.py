@@ -0,0 +1,153 @@
+import asyncio
+import json
+import random
+import time
+from typing import Dict, Any, Optional
+from aiohttp import web
+
+
+class UpstreamProfile:
+    """Latency and failure behaviour of a stubbed upstream API"""
+
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        error_rate: float = 0,
+        rate_limit_rate: float = 0,
+        retry_after_seconds: int = 1,
+        stall_rate: float = 0,
+        stall_ms: float = 30000
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after_seconds = retry_after_seconds
+        self.stall_rate = stall_rate
+        self.stall_ms = stall_ms
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "UpstreamProfile":
+        return cls(**(data or {}))
+
+    async def delay(self):
+        """Sleep for one sampled response time; a stall stands in for a hung upstream"""
+        if self.stall_rate and random.random() < self.stall_rate:
+            await asyncio.sleep(self.stall_ms / 1000)
+            return
+        latency = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+
+    def failure(self) -> Optional[web.Response]:
+        """An injected 429 or 500 response, or None to answer normally"""
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            return web.json_response(
+                {"error": {"message": "Rate limit exceeded (stub)"}},
+                status=429,
+                headers={"Retry-After": str(self.retry_after_seconds)}
+            )
+        if roll < self.rate_limit_rate + self.error_rate:
+            return web.json_response({"error": {"message": "Upstream failure (stub)"}}, status=500)
+        return None
+
+
+class StubServer:
+    """An aiohttp app served on a local port, counting the requests it answers"""
+
+    def __init__(self, profile: UpstreamProfile):
+        self.profile = profile
+        self.requests = 0
+        self.failures = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.port: Optional[int] = None
+
+    def build_app(self) -> web.Application:
+        raise NotImplementedError
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self, port: int = 0):
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _respond(self, request: web.Request, handler):
+        self.requests += 1
+        await self.profile.delay()
+        failure = self.profile.failure()
+        if failure is not None:
+            self.failures += 1
+            return failure
+        return await handler(request)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"requests": self.requests, "injected_failures": self.failures}
+
+
+class StubOpenRouter(StubServer):
+    """OpenAI-compatible /chat/completions that answers with synthetic SoF events"""
+
+    def __init__(self, profile: UpstreamProfile, events_per_reply: int = 12, stream_chunk_chars: int = 48):
+        super().__init__(profile)
+        self.events_per_reply = events_per_reply
+        self.stream_chunk_chars = stream_chunk_chars
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/chat/completions", lambda r: self._respond(r, self._completion))
+        return app
+
+    async def _completion(self, request: web.Request):
+        payload = await request.json()
+        content = json.dumps(self._sof_reply())
+        prompt_chars = sum(len(m.get("content", "")) for m in payload.get("messages", []))
+        usage = {
+            "prompt_tokens": prompt_chars // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (prompt_chars + len(content)) // 4
+        }
+
+        if not payload.get("stream"):
+            return web.json_response({
+                "id": f"stub-{self.requests}",
+                "model": payload.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+                "usage": usage
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await response.write(b": stub keep-alive\n\n")
+        for i in range(0, len(content), self.stream_chunk_chars):
+            chunk = {"choices": [{"index": 0, "delta": {"content": content[i:i + self.stream_chunk_chars]}}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    def _sof_reply(self) -> Dict[str, Any]:
+        start = int(time.time()) - self.events_per_reply * 3600
+        events = []
+        for i in range(self.events_per_reply):
+            begins = start + i * 3600
+            events.append({
+                "event_name": f"Cargo operations stage {i + 1}",
+                "start_time_iso": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(begins)),
+                "end_time_iso": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(begins + 3000)),
+                "page": 1,
+                "row_index": i + 1,
+                "confidence": 0.9
+            })
+        return {"events": events, "anomalies": []}
\ No newline at end of file
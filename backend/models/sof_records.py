@@ -0,0 +1,74 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, Text, Integer, Float, DateTime, ForeignKey, Index, DDL, event
+from sqlalchemy.orm import Mapped, mapped_column
+from ..core.database import Base
+
+
+class SofDocumentRow(Base):
+    """A processed Statement of Facts with its full extracted text"""
+
+    __tablename__ = "sof_documents"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    filename: Mapped[str] = mapped_column(String(255))
+    vessel_name: Mapped[Optional[str]] = mapped_column(String(120), index=True)
+    port_name: Mapped[Optional[str]] = mapped_column(String(120), index=True)
+    mode: Mapped[str] = mapped_column(String(20))
+    file_size: Mapped[int] = mapped_column(Integer)
+    total_events: Mapped[int] = mapped_column(Integer)
+    raw_text: Mapped[str] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+
+    __table_args__ = (
+        # Keyset pagination walks (created_at, id) newest first
+        Index("ix_sof_documents_created_id", "created_at", "id"),
+    )
+
+
+class SofEventRow(Base):
+    """An extracted SoF event; vessel and port are denormalized for indexed search"""
+
+    __tablename__ = "sof_events"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    document_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("sof_documents.id", ondelete="CASCADE"), index=True
+    )
+    vessel_name: Mapped[Optional[str]] = mapped_column(String(120))
+    port_name: Mapped[Optional[str]] = mapped_column(String(120))
+    event_name: Mapped[str] = mapped_column(Text)
+    event_type: Mapped[str] = mapped_column(String(40))
+    start_time: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    end_time: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    duration_minutes: Mapped[Optional[int]] = mapped_column(Integer)
+    page: Mapped[Optional[int]] = mapped_column(Integer)
+    row_index: Mapped[Optional[int]] = mapped_column(Integer)
+    confidence: Mapped[Optional[float]] = mapped_column(Float)
+
+    __table_args__ = (
+        Index("ix_sof_events_start_id", "start_time", "id"),
+        Index("ix_sof_events_vessel_start", "vessel_name", "start_time"),
+        Index("ix_sof_events_port_start", "port_name", "start_time"),
+        Index("ix_sof_events_type_start", "event_type", "start_time"),
+    )
+
+
+# Full-text index over the raw text: a GIN tsvector index on Postgres,
+# an FTS5 shadow table (filled by the repository) on SQLite
+event.listen(
+    SofDocumentRow.__table__,
+    "after_create",
+    DDL(
+        "CREATE INDEX IF NOT EXISTS ix_sof_documents_raw_text_fts "
+        "ON sof_documents USING GIN (to_tsvector('english', raw_text))"
+    ).execute_if(dialect="postgresql")
+)
+event.listen(
+    SofDocumentRow.__table__,
+    "after_create",
+    DDL(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS sof_documents_fts "
+        "USING fts5(document_id UNINDEXED, raw_text)"
+    ).execute_if(dialect="sqlite")
+)
\ No newline at end of file
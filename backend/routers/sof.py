@@ -1,7 +1,8 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, BackgroundTasks, Depends, Form
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, File, UploadFile, HTTPException, BackgroundTasks, Depends, Form, Header, Query
+from fastapi.responses import FileResponse, StreamingResponse
 from typing import List, Optional
 import asyncio
+import json
 import os
 import uuid
 from datetime import datetime
@@ -9,69 +10,144 @@ from pathlib import Path
 
 from ..services.document_processor import DocumentProcessor
 from ..services.ai_service import AIService
-from ..models.sof import SofProcessingRequest, SofProcessingResponse, SofEvent
+from ..services.llm_cache import llm_cache
+from ..services.llm_scheduler import llm_scheduler, PRIORITIES
+from ..services.sof_repository import SofRepository
+from ..services.admission import admission, AdmissionRejected
+from ..services.document_source import DocumentSource, UploadTooLarge
+from ..services.ocr_service import OCRService
+from ..services.page_filter import PageRangeError, parse_page_ranges
 from ..core.config import settings
 
 router = APIRouter()
 
 @router.post("/process", response_model=dict)
 async def process_sof_document(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     mode: str = Form("accuracy"),
     port_timezone: str = Form("UTC"),
-    enable_ocr: bool = Form(True)
+    enable_ocr: bool = Form(True),
+    vessel_name: Optional[str] = Form(None),
+    port_name: Optional[str] = Form(None),
+    persist: bool = Form(True),
+    pages: Optional[str] = Form(None, description="1-based page ranges to process, e.g. 1-3,7,10-"),
+    auto_pages: bool = Form(False, description="Only process pages that look like a Statement of Facts"),
+    x_tenant_id: Optional[str] = Header(None),
+    x_priority: str = Header(
+        "interactive",
+        description="LLM queue class: interactive for user uploads, batch for reprocessing and bulk imports"
+    )
 ):
     """
     Process Statement of Facts document and extract events with AI/OCR
     """
-    # Validate file
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="No file provided")
-    
-    file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in settings.SUPPORTED_FORMATS:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Unsupported file format. Supported: {', '.join(settings.SUPPORTED_FORMATS)}"
-        )
-    
-    if file.size and file.size > settings.MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="File size exceeds maximum limit")
+    validate_upload(file)
+    validate_pages(pages)
+    validate_priority(x_priority)
+    check_admission(file.filename, mode, enable_ocr)
     
     # Generate unique processing ID
     processing_id = str(uuid.uuid4())
-    
-    # Save uploaded file
-    upload_path = os.path.join(settings.UPLOAD_DIR, f"{processing_id}_{file.filename}")
+    source = None
     
     try:
-        # Save file
-        with open(upload_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        # Keep the upload in memory; only very large files spill to UPLOAD_DIR
+        source = await DocumentSource.from_upload(
+            file, settings.UPLOAD_DIR, settings.IN_MEMORY_UPLOAD_LIMIT, settings.MAX_FILE_SIZE
+        )
         
         # Process document
-        processor = DocumentProcessor()
+        processor = DocumentProcessor(priority=x_priority, tenant=x_tenant_id or "default")
         result = await processor.process_sof_document(
-            upload_path, mode, port_timezone, enable_ocr
+            source, mode, port_timezone, enable_ocr,
+            include_full_text=True, pages=pages, auto_pages=auto_pages
         )
+        full_text = result.pop("full_text")
         
         # Add processing metadata
         result["processing_id"] = processing_id
         result["filename"] = file.filename
-        result["file_size"] = len(content)
+        result["file_size"] = source.size
         
-        # Schedule cleanup
-        background_tasks.add_task(cleanup_file, upload_path)
+        if persist and settings.SOF_STORE_ENABLED:
+            # Storage problems must not discard a completed extraction
+            try:
+                result["document_id"] = await asyncio.to_thread(
+                    lambda: SofRepository().save_result(result, full_text, vessel_name, port_name)
+                )
+            except Exception as e:
+                result["document_id"] = None
+                result["storage_error"] = str(e)
         
         return result
         
+    except AdmissionRejected as e:
+        raise admission_error(e)
+    except (PageRangeError, UploadTooLarge) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        # Clean up on error
-        if os.path.exists(upload_path):
-            os.remove(upload_path)
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+    finally:
+        if source is not None:
+            source.cleanup()
+
+@router.post("/process-stream")
+async def process_sof_document_stream(
+    file: UploadFile = File(...),
+    mode: str = Form("accuracy"),
+    port_timezone: str = Form("UTC"),
+    enable_ocr: bool = Form(True),
+    pages: Optional[str] = Form(None, description="1-based page ranges to process, e.g. 1-3,7,10-"),
+    auto_pages: bool = Form(False, description="Only process pages that look like a Statement of Facts"),
+    x_tenant_id: Optional[str] = Header(None),
+    x_priority: str = Header(
+        "interactive",
+        description="LLM queue class: interactive for user uploads, batch for reprocessing and bulk imports"
+    )
+):
+    """
+    Process Statement of Facts document and stream events as Server-Sent Events
+    """
+    validate_upload(file)
+    validate_pages(pages)
+    validate_priority(x_priority)
+    check_admission(file.filename, mode, enable_ocr)
+    
+    processing_id = str(uuid.uuid4())
+    
+    async def event_stream():
+        # The upload is read here, not in the handler: a generator that never
+        # starts (client gone before the first chunk) never runs its finally
+        source = None
+        try:
+            source = await DocumentSource.from_upload(
+                file, settings.UPLOAD_DIR, settings.IN_MEMORY_UPLOAD_LIMIT, settings.MAX_FILE_SIZE
+            )
+            yield format_sse("start", {
+                "processing_id": processing_id,
+                "filename": file.filename,
+                "file_size": source.size
+            })
+            processor = DocumentProcessor(priority=x_priority, tenant=x_tenant_id or "default")
+            async for item in processor.stream_sof_document(
+                source, mode, port_timezone, enable_ocr, pages, auto_pages
+            ):
+                yield format_sse(item["type"], item["data"])
+        except AdmissionRejected as e:
+            yield format_sse("error", {"detail": str(e), "retry_after": e.retry_after})
+        except (PageRangeError, UploadTooLarge) as e:
+            yield format_sse("error", {"detail": str(e)})
+        except Exception as e:
+            yield format_sse("error", {"detail": f"Processing failed: {str(e)}"})
+        finally:
+            if source is not None:
+                source.cleanup()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.post("/export")
 async def export_events(
@@ -156,6 +232,78 @@ async def get_sof_templates():
         "max_file_size_mb": settings.MAX_FILE_SIZE // (1024 * 1024)
     }
 
+@router.get("/documents")
+async def list_sof_documents(
+    vessel: Optional[str] = Query(None, description="Vessel name"),
+    port: Optional[str] = Query(None, description="Port name"),
+    q: Optional[str] = Query(None, description="Full-text search over extracted text"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page"),
+    limit: int = Query(50, ge=1, le=200)
+):
+    """
+    Search stored SoF documents, newest first
+    """
+    require_store()
+    try:
+        return await asyncio.to_thread(
+            lambda: SofRepository().search_documents(vessel, port, q, cursor, limit)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Document search failed: {str(e)}")
+
+@router.get("/documents/{document_id}")
+async def get_sof_document(document_id: str):
+    """
+    Get a stored SoF document with its full text and events
+    """
+    require_store()
+    try:
+        document = await asyncio.to_thread(lambda: SofRepository().get_document(document_id))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Document lookup failed: {str(e)}")
+    
+    if document is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return document
+
+@router.get("/events")
+async def search_sof_events(
+    vessel: Optional[str] = Query(None, description="Vessel name"),
+    port: Optional[str] = Query(None, description="Port name"),
+    event_type: Optional[str] = Query(None, description="Event type, e.g. cargo_operations"),
+    start_from: Optional[datetime] = Query(None, description="Events starting at or after"),
+    start_to: Optional[datetime] = Query(None, description="Events starting before"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page"),
+    limit: int = Query(100, ge=1, le=200)
+):
+    """
+    Search stored SoF events in chronological order
+    """
+    require_store()
+    try:
+        return await asyncio.to_thread(
+            lambda: SofRepository().search_events(
+                vessel, port, event_type, start_from, start_to, cursor, limit
+            )
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Event search failed: {str(e)}")
+
+@router.get("/metrics")
+async def get_processing_metrics():
+    """
+    Get admission gauges, LLM scheduler queue/wait metrics and cache hit rates
+    """
+    return {
+        "admission": admission.metrics(),
+        "llm_scheduler": llm_scheduler.metrics(),
+        "llm_cache": llm_cache.stats()
+    }
+
 @router.post("/analyze-structure")
 async def analyze_document_structure(
     file: UploadFile = File(...)
@@ -166,36 +314,32 @@ async def analyze_document_structure(
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file provided")
     
-    processing_id = str(uuid.uuid4())
-    upload_path = os.path.join(settings.UPLOAD_DIR, f"struct_{processing_id}_{file.filename}")
+    try:
+        admission.check("ocr")
+    except AdmissionRejected as e:
+        raise admission_error(e)
+    
+    source = None
     
     try:
-        # Save file temporarily
-        with open(upload_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        # Analyze structure
-        from ..services.ocr_service import OCRService
+        source = await DocumentSource.from_upload(
+            file, settings.UPLOAD_DIR, settings.IN_MEMORY_UPLOAD_LIMIT, settings.MAX_FILE_SIZE
+        )
         ocr_service = OCRService()
         
-        if file.filename.lower().endswith('.pdf'):
-            # Convert first page to image for structure analysis
-            import pdf2image
-            images = pdf2image.convert_from_path(upload_path, first_page=1, last_page=1)
-            if images:
-                temp_image_path = upload_path.replace('.pdf', '_temp.png')
-                images[0].save(temp_image_path)
-                structure = await ocr_service.detect_document_structure(temp_image_path)
-                os.remove(temp_image_path)
-            else:
-                structure = {"error": "Could not convert PDF to image"}
+        if source.suffix == '.pdf':
+            # Rasterize the first page straight into an array for structure analysis
+            async with admission.slot("ocr"):
+                pages = await asyncio.to_thread(
+                    ocr_service.rasterize_pdf, source, first_page=1, last_page=1
+                )
+                if pages:
+                    structure = await ocr_service.detect_document_structure(pages[0])
+                else:
+                    structure = {"error": "Could not convert PDF to image"}
         else:
             structure = {"error": "Structure analysis only supported for PDF files"}
         
-        # Cleanup
-        os.remove(upload_path)
-        
         return {
             "filename": file.filename,
             "structure": structure,
@@ -205,10 +349,74 @@ async def analyze_document_structure(
             }
         }
         
+    except AdmissionRejected as e:
+        raise admission_error(e)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        if os.path.exists(upload_path):
-            os.remove(upload_path)
         raise HTTPException(status_code=500, detail=f"Structure analysis failed: {str(e)}")
+    finally:
+        if source is not None:
+            source.cleanup()
+
+def validate_upload(file: UploadFile):
+    """Reject uploads without a name, with an unsupported format or oversized"""
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file provided")
+    
+    file_ext = Path(file.filename).suffix.lower()
+    if file_ext not in settings.SUPPORTED_FORMATS:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Unsupported file format. Supported: {', '.join(settings.SUPPORTED_FORMATS)}"
+        )
+    
+    if file.size and file.size > settings.MAX_FILE_SIZE:
+        raise HTTPException(status_code=400, detail="File size exceeds maximum limit")
+
+def validate_pages(pages: Optional[str]):
+    """Reject a malformed page range before the upload is read"""
+    if pages:
+        try:
+            parse_page_ranges(pages)
+        except PageRangeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+def validate_priority(priority: str):
+    """Reject an unknown LLM queue class before admission"""
+    if priority not in PRIORITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported priority. Supported: {', '.join(PRIORITIES)}"
+        )
+
+def require_store():
+    """Stored-document endpoints answer 503 while the SoF store is switched off"""
+    if not settings.SOF_STORE_ENABLED:
+        raise HTTPException(status_code=503, detail="SoF store is disabled (SOF_STORE_ENABLED=false)")
+
+def check_admission(filename: str, mode: str, enable_ocr: bool):
+    """Fail fast with 429 before reading the upload if a needed work pool is saturated"""
+    pools = []
+    if enable_ocr and filename.lower().endswith('.pdf'):
+        pools.append("ocr")
+    if mode == "accuracy":
+        pools.append("llm")
+    try:
+        admission.check(*pools)
+    except AdmissionRejected as e:
+        raise admission_error(e)
+
+def admission_error(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+def format_sse(event: str, data) -> str:
+    """Encode one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 async def cleanup_file(file_path: str):
     """Background task to clean up temporary files"""
@@ -0,0 +1,110 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any
+from ..core.config import settings
+
+
+class AdmissionRejected(Exception):
+    """Raised when a work pool's wait queue is full"""
+
+    def __init__(self, pool: str, retry_after: int):
+        super().__init__(f"Server busy ({pool} queue full), retry after {retry_after}s")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+class _WorkPool:
+    """Concurrency budget with a bounded wait queue and service-time tracking"""
+
+    def __init__(self, name: str, concurrency: int, max_queue: int, initial_service_seconds: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.completed = 0
+        # Exponentially weighted mean of how long one unit of work takes
+        self.service_seconds = initial_service_seconds
+
+    def is_full(self) -> bool:
+        return self.in_flight >= self.concurrency and self.waiting >= self.max_queue
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained, at observed throughput"""
+        backlog = self.waiting + 1
+        seconds = backlog * self.service_seconds / self.concurrency
+        return max(1, min(300, math.ceil(seconds)))
+
+    def record(self, elapsed: float, alpha: float = 0.2):
+        self.completed += 1
+        self.service_seconds = (1 - alpha) * self.service_seconds + alpha * elapsed
+
+
+class AdmissionController:
+    """Separate OCR and LLM concurrency budgets with fast rejection when saturated"""
+
+    def __init__(self, pools: Dict[str, _WorkPool]):
+        self.pools = pools
+
+    @classmethod
+    def from_settings(cls) -> "AdmissionController":
+        return cls({
+            "ocr": _WorkPool("ocr", settings.OCR_CONCURRENCY, settings.OCR_QUEUE_LIMIT, 30.0),
+            "llm": _WorkPool("llm", settings.LLM_CONCURRENCY, settings.LLM_QUEUE_LIMIT, 20.0),
+        })
+
+    def check(self, *pool_names: str):
+        """Reject up front, before an upload is read, if any needed pool is saturated"""
+        for name in pool_names:
+            pool = self.pools[name]
+            if pool.is_full():
+                pool.rejected += 1
+                raise AdmissionRejected(name, pool.retry_after())
+
+    @asynccontextmanager
+    async def slot(self, name: str):
+        """Hold one unit of the pool's concurrency budget, queueing if needed"""
+        pool = self.pools[name]
+        if pool.is_full():
+            pool.rejected += 1
+            raise AdmissionRejected(name, pool.retry_after())
+
+        pool.waiting += 1
+        try:
+            await pool.semaphore.acquire()
+        finally:
+            pool.waiting -= 1
+
+        pool.admitted += 1
+        pool.in_flight += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            pool.in_flight -= 1
+            pool.semaphore.release()
+            pool.record(time.monotonic() - started)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "in_flight": pool.in_flight,
+                "waiting": pool.waiting,
+                "concurrency": pool.concurrency,
+                "max_queue": pool.max_queue,
+                "admitted": pool.admitted,
+                "rejected": pool.rejected,
+                "completed": pool.completed,
+                "avg_service_seconds": round(pool.service_seconds, 3),
+                "retry_after_estimate": pool.retry_after()
+            }
+            for name, pool in self.pools.items()
+        }
+
+
+admission = AdmissionController.from_settings()
\ No newline at end of file
@@ -1,19 +1,42 @@
 import aiohttp
 import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from ..core.config import settings
+from .weather_impact import WeatherImpactEngine
+from .llm_cache import llm_cache, CACHE_USE
+from .template_merger import TemplateMerger
+from .stream_parser import IncrementalEventParser
+from .llm_scheduler import llm_scheduler, RateLimitedError
 import asyncio
 
 class AIService:
-    def __init__(self):
+    def __init__(self, priority: str = "interactive", tenant: str = "default"):
+        self.priority = priority
+        self.tenant = tenant
         self.api_key = settings.OPENROUTER_API_KEY
         self.base_url = settings.OPENROUTER_BASE_URL
         self.model = settings.OPENROUTER_MODEL
+        self.weather_engine = WeatherImpactEngine()
+        self.template_merger = TemplateMerger()
         
     async def extract_sof_events(self, text: str, port_timezone: str = "UTC") -> Dict[str, Any]:
         """Extract events from Statement of Facts text using AI"""
         
-        prompt = f"""
+        return await self._make_request(self._sof_events_prompt(text, port_timezone))
+    
+    async def stream_sof_events(self, text: str, port_timezone: str = "UTC") -> AsyncIterator[Dict[str, Any]]:
+        """Stream extracted events as they complete, followed by anomalies"""
+        
+        parser = IncrementalEventParser("events")
+        async for chunk in self._stream_request(self._sof_events_prompt(text, port_timezone)):
+            for event in parser.feed(chunk):
+                yield {"type": "event", "data": event}
+        
+        result = parser.finish()
+        yield {"type": "anomalies", "data": result.get("anomalies", [])}
+    
+    def _sof_events_prompt(self, text: str, port_timezone: str) -> str:
+        return f"""
         You are a maritime document processing expert. Extract all events from this Statement of Facts document.
         
         Port Timezone: {port_timezone}
@@ -51,10 +74,8 @@ class AIService:
         - Detect anomalies like time gaps, overlaps, or unclear entries
         - Be template-agnostic - work with any SoF format
         """
-        
-        return await self._make_request(prompt)
     
-    async def process_fixture_recap(self, text: str) -> Dict[str, Any]:
+    async def process_fixture_recap(self, text: str, cache_mode: str = CACHE_USE) -> Dict[str, Any]:
         """Process free-text fixture recap into structured data"""
         
         prompt = f"""
@@ -78,109 +99,257 @@ class AIService:
         Extract all available information. Use null for missing fields.
         """
         
-        return await self._make_request(prompt)
+        return await self._make_request(prompt, cache_mode=cache_mode)
     
-    async def generate_charter_party(self, recap_data: Dict, negotiated_clauses: str, template_content: str) -> Dict[str, Any]:
+    async def generate_charter_party(
+        self,
+        recap_data: Dict,
+        negotiated_clauses: str,
+        template_content: str,
+        cache_mode: str = CACHE_USE
+    ) -> Dict[str, Any]:
         """Generate charter party document by merging inputs"""
         
-        prompt = f"""
-        Generate a complete Charter Party document by intelligently merging:
+        # Recap placeholders are filled locally; only clause integration uses the LLM
+        content, changes = self.template_merger.merge_recap(template_content, recap_data)
+        sections = self.template_merger.index_sections(content)
+        
+        amendments: Dict[int, Dict[str, Any]] = {}
+        additions: List[str] = []
+        for clause in self.template_merger.split_clauses(negotiated_clauses):
+            section = self.template_merger.match_section(clause, sections)
+            if section is None:
+                additions.append(clause)
+            else:
+                amendments.setdefault(section["start"], {"section": section, "clauses": []})["clauses"].append(clause)
         
-        1. Fixture Recap Data:
-        {json.dumps(recap_data, indent=2)}
+        targets = sorted(amendments.values(), key=lambda a: a["section"]["start"])
+        merged_sections = await asyncio.gather(*[
+            self._integrate_clauses(
+                content[t["section"]["start"]:t["section"]["end"]], t["clauses"], cache_mode
+            )
+            for t in targets
+        ])
         
-        2. Negotiated Clauses:
-        {negotiated_clauses}
+        for target, merged in zip(targets, merged_sections):
+            section = target["section"]
+            changes.append({
+                "field": f"Clause {section['number']}",
+                "original_value": content[section["start"]:section["end"]].strip(),
+                "new_value": merged.strip(),
+                "source": "negotiated_clauses"
+            })
         
-        3. Base Template Content:
-        {template_content[:2000]}...
+        # Splice from the end so earlier offsets stay valid
+        for target, merged in reversed(list(zip(targets, merged_sections))):
+            section = target["section"]
+            content = content[:section["start"]] + merged + content[section["end"]:]
+        
+        content = self.template_merger.append_special_clauses(content, additions)
+        for clause in additions:
+            changes.append({
+                "field": "Special Clauses",
+                "original_value": "",
+                "new_value": clause,
+                "source": "negotiated_clauses"
+            })
+        
+        return {
+            "content": content,
+            "changes": changes
+        }
+    
+    async def _integrate_clauses(self, section_text: str, clauses: List[str], cache_mode: str) -> str:
+        """Rewrite one template section to incorporate its negotiated clauses"""
+        
+        clause_text = "\n\n".join(clauses)
+        prompt = f"""
+        Amend this Charter Party clause to incorporate the negotiated terms.
+        
+        Original Clause:
+        {section_text}
+        
+        Negotiated Terms:
+        {clause_text}
         
         Return JSON with:
         {{
-            "content": "Full charter party document text",
-            "changes": [
-                {{
-                    "field": "Vessel Name",
-                    "original_value": "[VESSEL_NAME]",
-                    "new_value": "MV EXAMPLE",
-                    "source": "recap"
-                }}
-            ]
+            "content": "Full amended clause text, keeping its number and heading"
         }}
         
-        Merge intelligently:
-        - Replace template placeholders with recap data
-        - Integrate negotiated clauses appropriately
-        - Maintain legal structure and formatting
-        - Track all changes made
+        Keep the legal wording and formatting of the original where it is not amended.
         """
         
-        return await self._make_request(prompt)
+        result = await self._make_request(prompt, cache_mode=cache_mode)
+        merged = result.get("content")
+        if not merged:
+            # Unusable reply: keep the original and append the terms verbatim
+            return section_text.rstrip() + "\n" + clause_text + "\n\n"
+        
+        # Preserve the whitespace that separated this section from the next
+        trailing = section_text[len(section_text.rstrip()):]
+        return merged.rstrip() + trailing
     
-    async def analyze_weather_impact(self, weather_data: Dict, route_data: Dict) -> Dict[str, Any]:
+    async def analyze_weather_impact(
+        self,
+        weather_data: Dict,
+        route_data: Dict,
+        include_narrative: bool = False
+    ) -> Dict[str, Any]:
         """Analyze weather impact on maritime operations"""
         
-        prompt = f"""
-        Analyze weather impact on this maritime route:
-        
-        Weather Data:
-        {json.dumps(weather_data, indent=2)}
+        # Scores are computed locally; the LLM only phrases the narrative
+        analysis = self.weather_engine.evaluate(weather_data, route_data)
         
-        Route Data:
-        {json.dumps(route_data, indent=2)}
+        if include_narrative and self.api_key:
+            summary = {k: v for k, v in analysis.items() if k != "segments"}
+            prompt = f"""
+        Write a short voyage weather briefing for the master from this computed analysis.
+        Do not change any numbers.
         
-        Provide recommendations for:
-        - Optimal speed adjustments
-        - Route modifications
-        - Risk assessments
-        - ETA impacts
+        Analysis:
+        {json.dumps(summary, separators=(',', ':'))}
         
-        Return structured analysis with actionable recommendations.
+        Return JSON with:
+        {{
+            "narrative": "Briefing text"
+        }}
         """
+            
+            result = await self._make_request(prompt)
+            analysis["narrative"] = result.get("narrative") or result.get("content")
         
-        return await self._make_request(prompt)
+        return analysis
     
-    async def _make_request(self, prompt: str) -> Dict[str, Any]:
+    async def _make_request(self, prompt: str, cache_mode: Optional[str] = None) -> Dict[str, Any]:
         """Make request to OpenRouter API"""
         
         if not self.api_key:
             raise Exception("OpenRouter API key not configured")
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://maritime-assistant.com",
-            "X-Title": "Maritime Assistant"
-        }
+        if cache_mode is None or not llm_cache.is_cacheable(settings.TEMPERATURE):
+            return await self._scheduled_completion(prompt)
         
-        payload = {
-            "model": self.model,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            "max_tokens": settings.MAX_TOKENS,
-            "temperature": settings.TEMPERATURE
-        }
+        key = llm_cache.make_key(prompt, self.model, settings.TEMPERATURE, settings.MAX_TOKENS)
+        return await llm_cache.get_or_fetch(key, lambda: self._scheduled_completion(prompt), cache_mode)
+    
+    async def _scheduled_completion(self, prompt: str) -> Dict[str, Any]:
+        """Wait for a rate-limit slot, retrying after upstream 429 responses"""
+        
+        estimate = self._estimate_tokens(prompt)
+        for attempt in range(settings.LLM_MAX_RATE_LIMIT_RETRIES + 1):
+            await llm_scheduler.acquire(estimate, self.priority, self.tenant)
+            try:
+                result, used_tokens = await self._post_completion(prompt)
+            except RateLimitedError as e:
+                await llm_scheduler.throttle(e.retry_after)
+                if attempt == settings.LLM_MAX_RATE_LIMIT_RETRIES:
+                    raise
+                continue
+            await llm_scheduler.report_usage(estimate, used_tokens)
+            return result
+    
+    async def _post_completion(self, prompt: str):
+        """Send a chat completion request; return the parsed reply and tokens used"""
         
         async with aiohttp.ClientSession() as session:
             async with session.post(
                 f"{self.base_url}/chat/completions",
-                headers=headers,
-                json=payload
+                headers=self._headers(),
+                json=self._payload(prompt)
             ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"AI API error: {error_text}")
+                await self._raise_for_status(response)
                 
                 result = await response.json()
                 content = result["choices"][0]["message"]["content"]
+                used_tokens = (result.get("usage") or {}).get("total_tokens")
                 
                 # Try to parse as JSON
                 try:
-                    return json.loads(content)
+                    return json.loads(content), used_tokens
                 except json.JSONDecodeError:
                     # If not JSON, return as text
-                    return {"content": content}
\ No newline at end of file
+                    return {"content": content}, used_tokens
+    
+    async def _stream_request(self, prompt: str) -> AsyncIterator[str]:
+        """Stream completion text deltas from OpenRouter as they arrive"""
+        
+        if not self.api_key:
+            raise Exception("OpenRouter API key not configured")
+        
+        payload = self._payload(prompt)
+        payload["stream"] = True
+        
+        # Streams are not retried on 429: part of the reply may already be delivered
+        await llm_scheduler.acquire(self._estimate_tokens(prompt), self.priority, self.tenant)
+        
+        async with aiohttp.ClientSession() as session:
+            async with session.post(
+                f"{self.base_url}/chat/completions",
+                headers=self._headers(),
+                json=payload
+            ) as response:
+                try:
+                    await self._raise_for_status(response)
+                except RateLimitedError as e:
+                    await llm_scheduler.throttle(e.retry_after)
+                    raise
+                
+                # Server-Sent Events: "data: {...}" lines, ": comment" keep-alives
+                async for raw_line in response.content:
+                    line = raw_line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    
+                    try:
+                        chunk = json.loads(data)
+                    except json.JSONDecodeError:
+                        continue
+                    if "error" in chunk:
+                        raise Exception(f"AI API error: {chunk['error']}")
+                    
+                    choices = chunk.get("choices") or [{}]
+                    delta = choices[0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+    
+    async def _raise_for_status(self, response: aiohttp.ClientResponse):
+        if response.status == 429:
+            error_text = await response.text()
+            try:
+                retry_after = float(response.headers.get("Retry-After", 5))
+            except ValueError:
+                retry_after = 5.0
+            raise RateLimitedError(retry_after, error_text)
+        if response.status != 200:
+            error_text = await response.text()
+            raise Exception(f"AI API error: {error_text}")
+    
+    @staticmethod
+    def _estimate_tokens(prompt: str) -> int:
+        # Roughly four characters per token, plus a typical completion
+        return len(prompt) // 4 + settings.LLM_COMPLETION_TOKEN_ESTIMATE
+    
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://maritime-assistant.com",
+            "X-Title": "Maritime Assistant"
+        }
+    
+    def _payload(self, prompt: str) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "max_tokens": settings.MAX_TOKENS,
+            "temperature": settings.TEMPERATURE
+        }
\ No newline at end of file
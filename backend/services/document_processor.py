@@ -1,98 +1,278 @@
 import asyncio
 import os
 import json
-from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Union, Tuple
 from datetime import datetime, timedelta
 import docx
 import PyPDF2
 import aiofiles
 from .ai_service import AIService
 from .ocr_service import OCRService
-from ..models.sof import SofEvent
+from .event_store import EventColumns
+from .document_source import DocumentSource
+from .page_filter import PageRelevanceFilter, PageRangeError, parse_page_ranges, select_pages
+from .admission import admission
 from ..core.config import settings
 
 class DocumentProcessor:
-    def __init__(self):
-        self.ai_service = AIService()
+    def __init__(self, priority: str = "interactive", tenant: str = "default"):
+        self.ai_service = AIService(priority=priority, tenant=tenant)
         self.ocr_service = OCRService()
+        self.page_filter = PageRelevanceFilter()
     
     async def process_sof_document(
         self, 
-        file_path: str, 
+        source: Union[DocumentSource, str], 
         mode: str = "accuracy",
         port_timezone: str = "UTC",
-        enable_ocr: bool = True
+        enable_ocr: bool = True,
+        include_full_text: bool = False,
+        pages: Optional[str] = None,
+        auto_pages: bool = False
     ) -> Dict[str, Any]:
-        """Process Statement of Facts document"""
+        """Process Statement of Facts document, optionally limited to a page range or to SoF-like pages"""
         
-        file_ext = Path(file_path).suffix.lower()
-        
-        # Extract text based on file type
-        if file_ext == '.pdf':
-            text = await self._extract_pdf_text(file_path, enable_ocr)
-        elif file_ext in ['.docx', '.doc']:
-            text = await self._extract_docx_text(file_path)
-        else:
-            raise ValueError(f"Unsupported file format: {file_ext}")
-        
-        if not text.strip():
-            raise ValueError("No text could be extracted from the document")
+        text, page_info = await self.extract_text_with_pages(source, enable_ocr, pages, auto_pages)
         
         # Process with AI for event extraction
         if mode == "accuracy":
-            result = await self.ai_service.extract_sof_events(text, port_timezone)
+            async with admission.slot("llm"):
+                result = await self.ai_service.extract_sof_events(text, port_timezone)
         else:
             # Cost-saving mode - use simpler processing
             result = await self._extract_events_simple(text, port_timezone)
         
         # Post-process and validate events
-        events = await self._validate_and_enhance_events(result.get('events', []))
-        anomalies = result.get('anomalies', [])
+        columns = EventColumns.from_dicts(result.get('events', []))
+        events = columns.to_dicts()
+        anomalies = result.get('anomalies', []) + columns.detect_anomalies()
         
-        return {
+        result = {
             "events": events,
             "stats": {
                 "total_events": len(events),
                 "low_confidence_count": sum(1 for e in events if e.get('confidence', 0) < 0.85),
                 "processing_time": datetime.utcnow().isoformat(),
                 "text_length": len(text),
-                "mode": mode
+                "mode": mode,
+                "pages": page_info
             },
             "anomalies": anomalies,
             "raw_text": text[:1000] + "..." if len(text) > 1000 else text
         }
+        if include_full_text:
+            result["full_text"] = text
+        
+        return result
     
-    async def _extract_pdf_text(self, file_path: str, enable_ocr: bool = True) -> str:
-        """Extract text from PDF file"""
-        text = ""
+    async def stream_sof_document(
+        self,
+        source: Union[DocumentSource, str],
+        mode: str = "accuracy",
+        port_timezone: str = "UTC",
+        enable_ocr: bool = True,
+        pages: Optional[str] = None,
+        auto_pages: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Process a Statement of Facts document, yielding events as they are extracted"""
+        
+        text, page_info = await self.extract_text_with_pages(source, enable_ocr, pages, auto_pages)
+        yield {"type": "text", "data": {"text_length": len(text), "pages": page_info}}
+        
+        if mode == "accuracy":
+            items = self._stream_llm_events(text, port_timezone)
+        else:
+            items = self._stream_simple_events(text, port_timezone)
+        
+        streamed: List[Dict] = []
+        anomalies: List[Dict] = []
+        async for item in items:
+            if item["type"] == "event":
+                event = self._enhance_event(item["data"], len(streamed))
+                if event is None:
+                    continue
+                streamed.append(event)
+                yield {"type": "event", "data": event}
+            elif item["type"] == "anomalies":
+                anomalies = item["data"]
+            else:
+                yield item
+        
+        # Cross-event checks need the full sequence, so they run once at the end
+        columns = EventColumns.from_dicts(streamed)
+        yield {"type": "anomalies", "data": anomalies + columns.detect_anomalies()}
+        
+        total_events = len(streamed)
+        low_confidence_count = sum(1 for e in streamed if e.get('confidence', 0) < 0.85)
+        yield {
+            "type": "done",
+            "data": {
+                "total_events": total_events,
+                "low_confidence_count": low_confidence_count,
+                "processing_time": datetime.utcnow().isoformat(),
+                "text_length": len(text),
+                "mode": mode
+            }
+        }
+    
+    async def extract_text(
+        self,
+        source: Union[DocumentSource, str],
+        enable_ocr: bool = True,
+        pages: Optional[str] = None,
+        auto_pages: bool = False
+    ) -> str:
+        """Extract text from a supported document, given in memory or as a file path"""
+        text, _ = await self.extract_text_with_pages(source, enable_ocr, pages, auto_pages)
+        return text
+    
+    async def extract_text_with_pages(
+        self,
+        source: Union[DocumentSource, str],
+        enable_ocr: bool = True,
+        pages: Optional[str] = None,
+        auto_pages: bool = False
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Extract text along with the document's page count and the pages actually read.
+        
+        pages is a 1-based spec such as "1-3,7,10-"; auto_pages keeps only pages
+        that look like a Statement of Facts. Both apply to PDFs only.
+        """
+        
+        if isinstance(source, str):
+            source = DocumentSource.from_path(source)
+        file_ext = source.suffix
+        ranges = parse_page_ranges(pages) if pages else None
+        total_pages = None
+        processed_pages = None
+        
+        # Extract text based on file type
+        if file_ext == '.pdf':
+            text, total_pages, processed_pages = await self._extract_pdf_text(
+                source, enable_ocr, ranges, auto_pages
+            )
+        elif file_ext in ['.docx', '.doc']:
+            if ranges:
+                raise PageRangeError("Page ranges are only supported for PDF documents")
+            text = await self._extract_docx_text(source)
+        else:
+            raise ValueError(f"Unsupported file format: {file_ext}")
+        
+        if not text.strip():
+            raise ValueError("No text could be extracted from the document")
+        
+        return text, {
+            "total_pages": total_pages,
+            "processed_pages": processed_pages,
+            "page_ranges": pages,
+            "auto_pages": auto_pages
+        }
+    
+    async def _extract_pdf_text(
+        self,
+        source: DocumentSource,
+        enable_ocr: bool = True,
+        ranges: Optional[List[Tuple[int, Optional[int]]]] = None,
+        auto_pages: bool = False
+    ) -> Tuple[str, Optional[int], Optional[List[int]]]:
+        """Extract text from PDF file; returns the text, page count and pages read"""
+        total_pages = None
+        candidates = None
+        page_texts = {}
         
         try:
-            # Try native PDF text extraction first
-            with open(file_path, 'rb') as file:
+            # Try native PDF text extraction first; unselected pages are never parsed
+            with source.open() as file:
                 pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text.strip():
-                        text += page_text + "\n"
-            
-            # If no text extracted and OCR is enabled, use OCR
-            if not text.strip() and enable_ocr:
-                text = await self.ocr_service.extract_text_from_pdf(file_path)
+                total_pages = len(pdf_reader.pages)
+                candidates = select_pages(ranges, total_pages) if ranges else list(range(1, total_pages + 1))
+                for number in candidates:
+                    page_texts[number] = pdf_reader.pages[number - 1].extract_text() or ""
                 
+        except PageRangeError:
+            raise
         except Exception as e:
-            if enable_ocr:
-                # Fallback to OCR
-                text = await self.ocr_service.extract_text_from_pdf(file_path)
-            else:
+            if not enable_ocr:
                 raise Exception(f"PDF text extraction failed: {str(e)}")
+            # Unreadable by PyPDF2; poppler may still count and render it
+            total_pages = await asyncio.to_thread(self.ocr_service.page_count, source)
+            if ranges:
+                candidates = select_pages(ranges, total_pages)
+            elif total_pages is not None:
+                candidates = list(range(1, total_pages + 1))
+            page_texts = {}
+        
+        text_pages = {number: page_text for number, page_text in page_texts.items() if page_text.strip()}
+        # Pages without a text layer (candidates None means every page of an unparsed PDF)
+        if candidates is None:
+            scanned = None
+        else:
+            scanned = [number for number in candidates if number not in text_pages]
+        
+        if not enable_ocr or scanned == []:
+            if not auto_pages:
+                return self._join_pages(text_pages, candidates, total_pages), total_pages, candidates
+            selected = self.page_filter.select(text_pages) if text_pages else []
+            return self._join_pages(text_pages, selected, total_pages), total_pages, selected
         
+        if text_pages and not auto_pages:
+            # A text layer was found; without page filtering the native text is used as is
+            return self._join_pages(text_pages, candidates, total_pages), total_pages, candidates
+        
+        text, selected = await self._ocr_pdf(source, text_pages, scanned, total_pages, auto_pages)
+        return text, total_pages, selected
+    
+    async def _ocr_pdf(
+        self,
+        source: DocumentSource,
+        text_pages: Dict[int, str],
+        scanned: Optional[List[int]],
+        total_pages: Optional[int],
+        auto_pages: bool
+    ) -> Tuple[str, Optional[List[int]]]:
+        """OCR pages without a text layer at full DPI, merged with native text by page.
+
+        With auto_pages, scanned pages are scored from a thumbnail pass alongside
+        the native pages and only selected scanned pages get full OCR.
+        """
+        async with admission.slot("ocr"):
+            if auto_pages:
+                thumbnails = await self.ocr_service.ocr_thumbnails(source, scanned)
+                selected = self.page_filter.select({**text_pages, **thumbnails})
+            else:
+                selected = scanned
+            
+            if not text_pages:
+                return await self.ocr_service.extract_text_from_pdf(source, selected), selected
+            
+            to_ocr = [number for number in selected if number not in text_pages]
+            ocr_texts = await self.ocr_service.ocr_pages(source, to_ocr) if to_ocr else {}
+        
+        return self._join_pages({**text_pages, **ocr_texts}, selected, total_pages, marked=bool(ocr_texts)), selected
+    
+    @staticmethod
+    def _join_pages(
+        page_texts: Dict[int, str],
+        selected: List[int],
+        total_pages: Optional[int],
+        marked: bool = False
+    ) -> str:
+        """Join page texts in order; page markers keep original numbers visible when pages were skipped"""
+        marked = marked or total_pages is None or len(selected) < total_pages
+        text = ""
+        for number in selected:
+            page_text = page_texts.get(number, "")
+            if page_text.strip():
+                if marked:
+                    text += f"--- Page {number} ---\n"
+                text += page_text + "\n"
         return text
     
-    async def _extract_docx_text(self, file_path: str) -> str:
+    async def _extract_docx_text(self, source: DocumentSource) -> str:
         """Extract text from DOCX file"""
         try:
-            doc = docx.Document(file_path)
+            with source.open() as file:
+                doc = docx.Document(file)
             text = ""
             
             for paragraph in doc.paragraphs:
@@ -162,52 +342,24 @@ class DocumentProcessor:
             "anomalies": []
         }
     
-    async def _validate_and_enhance_events(self, events: List[Dict]) -> List[Dict]:
-        """Validate and enhance extracted events"""
-        enhanced_events = []
-        
-        for event in events:
-            # Ensure required fields
-            if not event.get('event_name'):
-                continue
-            
-            # Validate and fix timestamps
-            start_time = event.get('start_time_iso')
-            end_time = event.get('end_time_iso')
-            
-            if start_time:
-                try:
-                    start_dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-                    event['start_time_iso'] = start_dt.isoformat() + 'Z'
-                except:
-                    event['start_time_iso'] = datetime.utcnow().isoformat() + 'Z'
-            
-            if end_time:
-                try:
-                    end_dt = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
-                    event['end_time_iso'] = end_dt.isoformat() + 'Z'
-                    
-                    # Calculate duration
-                    if start_time:
-                        start_dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-                        duration = (end_dt - start_dt).total_seconds() / 60
-                        event['duration_minutes'] = int(duration) if duration > 0 else None
-                except:
-                    event['end_time_iso'] = None
-            
-            # Ensure confidence score
-            if 'confidence' not in event:
-                event['confidence'] = 0.8
-            
-            # Ensure page and row_index
-            if 'page' not in event:
-                event['page'] = 1
-            if 'row_index' not in event:
-                event['row_index'] = len(enhanced_events) + 1
-            
-            enhanced_events.append(event)
-        
-        return enhanced_events
+    async def _stream_llm_events(self, text: str, port_timezone: str) -> AsyncIterator[Dict[str, Any]]:
+        """Stream LLM extraction while holding an LLM admission slot"""
+        async with admission.slot("llm"):
+            async for item in self.ai_service.stream_sof_events(text, port_timezone):
+                yield item
+    
+    async def _stream_simple_events(self, text: str, port_timezone: str) -> AsyncIterator[Dict[str, Any]]:
+        """Adapt cost-saving extraction to the streaming item format"""
+        result = await self._extract_events_simple(text, port_timezone)
+        for event in result['events']:
+            yield {"type": "event", "data": event}
+        yield {"type": "anomalies", "data": result['anomalies']}
+    
+    def _enhance_event(self, event: Dict, position: int) -> Optional[Dict]:
+        """Validate a single streamed event; position is its index among accepted events"""
+        event = dict(event, row_index=event.get('row_index') or position + 1)
+        events = EventColumns.from_dicts([event]).to_dicts()
+        return events[0] if events else None
     
     async def export_events_csv(self, events: List[Dict], file_path: str) -> str:
         """Export events to CSV format"""
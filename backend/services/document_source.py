@@ -0,0 +1,117 @@
+import io
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Optional
+from fastapi import UploadFile
+
+_READ_CHUNK = 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload of unknown size turns out to exceed the limit"""
+
+
+class DocumentSource:
+    """An uploaded document held in memory, or spilled to disk when very large.
+
+    In-memory documents are handed to parsers as BytesIO over the original
+    bytes (no copy) and to poppler/tesseract over stdin; only spilled
+    documents are read back from a path.
+    """
+
+    def __init__(self, filename: str, data: Optional[bytes] = None, path: Optional[str] = None):
+        if (data is None) == (path is None):
+            raise ValueError("DocumentSource needs exactly one of data or path")
+        self.filename = filename
+        self.data = data
+        self.path = path
+        self._owns_path = False
+
+    @classmethod
+    def from_bytes(cls, filename: str, data: bytes) -> "DocumentSource":
+        return cls(filename, data=data)
+
+    @classmethod
+    def from_path(cls, file_path: str) -> "DocumentSource":
+        return cls(Path(file_path).name, path=file_path)
+
+    @classmethod
+    async def from_upload(
+        cls,
+        upload: UploadFile,
+        spool_dir: str,
+        max_in_memory: int,
+        max_size: Optional[int] = None
+    ) -> "DocumentSource":
+        """Read an upload into memory, spilling to a temp file past max_in_memory bytes"""
+        if upload.size is not None and upload.size <= max_in_memory:
+            return cls(upload.filename, data=await upload.read())
+
+        # Size unknown or too large: buffer until the limit, then continue on disk
+        buffer = bytearray()
+        spill = None
+        spill_path = None
+        received = 0
+        try:
+            while True:
+                chunk = await upload.read(_READ_CHUNK)
+                if not chunk:
+                    break
+                # The declared size may be missing, so enforce the limit on what arrives
+                received += len(chunk)
+                if max_size is not None and received > max_size:
+                    raise UploadTooLarge("File size exceeds maximum limit")
+                if spill is None and len(buffer) + len(chunk) > max_in_memory:
+                    os.makedirs(spool_dir, exist_ok=True)
+                    fd, spill_path = tempfile.mkstemp(
+                        dir=spool_dir, prefix="spill_", suffix=Path(upload.filename).suffix
+                    )
+                    spill = os.fdopen(fd, "wb")
+                    spill.write(buffer)
+                    buffer = bytearray()
+                if spill is None:
+                    buffer += chunk
+                else:
+                    spill.write(chunk)
+        except BaseException:
+            if spill is not None:
+                spill.close()
+                os.remove(spill_path)
+            raise
+
+        if spill is None:
+            return cls(upload.filename, data=bytes(buffer))
+
+        spill.close()
+        source = cls(upload.filename, path=spill_path)
+        source._owns_path = True
+        return source
+
+    @property
+    def suffix(self) -> str:
+        return Path(self.filename).suffix.lower()
+
+    @property
+    def size(self) -> int:
+        if self.data is not None:
+            return len(self.data)
+        return os.path.getsize(self.path)
+
+    @property
+    def in_memory(self) -> bool:
+        return self.data is not None
+
+    def open(self) -> BinaryIO:
+        """Binary file object over the document; BytesIO shares the bytes buffer"""
+        if self.data is not None:
+            return io.BytesIO(self.data)
+        return open(self.path, "rb")
+
+    def cleanup(self):
+        """Remove the spill file, if this source created one"""
+        if self._owns_path and self.path and os.path.exists(self.path):
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
\ No newline at end of file
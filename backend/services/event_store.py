@@ -0,0 +1,204 @@
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Any, Iterable, Optional
+
+
+class SofEventRecord:
+    """Compact per-event record; timestamps live in the EventColumns arrays"""
+
+    __slots__ = (
+        "event_name", "page", "row_index", "confidence", "raw_start", "raw_end", "duration_minutes", "extra"
+    )
+
+    def __init__(
+        self,
+        event_name: str,
+        page: int = 1,
+        row_index: int = 0,
+        confidence: float = 0.8,
+        raw_start: Optional[str] = None,
+        raw_end: Optional[str] = None,
+        duration_minutes: Optional[float] = None,
+        extra: Optional[Dict[str, Any]] = None
+    ):
+        self.event_name = event_name
+        self.page = page
+        self.row_index = row_index
+        self.confidence = confidence
+        self.raw_start = raw_start
+        self.raw_end = raw_end
+        # As supplied by the extractor; only used when there is no end time to compute it from
+        self.duration_minutes = duration_minutes
+        self.extra = extra
+
+
+_KNOWN_FIELDS = {
+    "event_name", "start_time_iso", "end_time_iso", "duration_minutes",
+    "page", "row_index", "confidence"
+}
+
+
+class EventColumns:
+    """Columnar SoF events: datetime64 start/end arrays alongside slotted records.
+
+    Timestamps are parsed once, in bulk, when the store is built; validation,
+    durations, sorting and anomaly detection then run as array passes.
+    """
+
+    def __init__(self, records: List[SofEventRecord], start: np.ndarray, end: np.ndarray):
+        self.records = records
+        self.start = start
+        self.end = end
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @classmethod
+    def from_dicts(cls, events: Iterable[Dict[str, Any]]) -> "EventColumns":
+        """Build the store from extracted event dicts, dropping unnamed events"""
+        records = []
+        for event in events:
+            name = event.get('event_name')
+            if not name:
+                continue
+            extra = {k: v for k, v in event.items() if k not in _KNOWN_FIELDS} or None
+            records.append(SofEventRecord(
+                name,
+                event.get('page', 1),
+                event.get('row_index') or len(records) + 1,
+                event.get('confidence', 0.8),
+                event.get('start_time_iso'),
+                event.get('end_time_iso'),
+                event.get('duration_minutes'),
+                extra
+            ))
+
+        start = cls._parse_timestamps([r.raw_start for r in records])
+        end = cls._parse_timestamps([r.raw_end for r in records])
+        return cls(records, start, end)
+
+    def durations_minutes(self) -> np.ndarray:
+        """Event durations in minutes; NaN where unknown or not positive"""
+        minutes = (self.end - self.start) / np.timedelta64(1, "m")
+        return np.where(minutes > 0, minutes, np.nan)
+
+    def sort_order(self) -> np.ndarray:
+        """Stable indices ordering events by start time, unknown starts last"""
+        keys = self.start.astype(np.int64)
+        keys = np.where(np.isnat(self.start), np.iinfo(np.int64).max, keys)
+        return np.argsort(keys, kind="stable")
+
+    def sorted(self) -> "EventColumns":
+        order = self.sort_order()
+        return EventColumns([self.records[i] for i in order], self.start[order], self.end[order])
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Render validated events in the API's dict format"""
+        start_iso = self._format_timestamps(self.start)
+        end_iso = self._format_timestamps(self.end)
+        durations = self.durations_minutes()
+
+        events = []
+        for i, record in enumerate(self.records):
+            event = dict(record.extra) if record.extra else {}
+            event.update({
+                "event_name": record.event_name,
+                "start_time_iso": start_iso[i],
+                "end_time_iso": end_iso[i],
+                "duration_minutes": self._duration(record, self.end[i], durations[i]),
+                "page": record.page,
+                "row_index": record.row_index,
+                "confidence": record.confidence
+            })
+            events.append(event)
+        return events
+
+    def detect_anomalies(self, gap_minutes: float = 360) -> List[Dict[str, Any]]:
+        """Find invalid timestamps, negative durations, out-of-order rows, overlaps and gaps"""
+        anomalies = []
+        rows = [r.row_index for r in self.records]
+
+        has_raw_start = np.array([bool(r.raw_start) for r in self.records], dtype=bool)
+        has_raw_end = np.array([bool(r.raw_end) for r in self.records], dtype=bool)
+        bad_start = has_raw_start & np.isnat(self.start)
+        bad_end = has_raw_end & np.isnat(self.end)
+        for i in np.flatnonzero(bad_start | bad_end):
+            field = "start" if bad_start[i] else "end"
+            anomalies.append(self._anomaly(
+                "Invalid Timestamp", f"Unparseable {field} time for '{self.records[i].event_name}'", rows[i]
+            ))
+
+        valid = ~np.isnat(self.start)
+        negative = valid & ~np.isnat(self.end) & (self.end < self.start)
+        for i in np.flatnonzero(negative):
+            anomalies.append(self._anomaly(
+                "Negative Duration", f"'{self.records[i].event_name}' ends before it starts", rows[i]
+            ))
+
+        idx = np.flatnonzero(valid)
+        if len(idx) < 2:
+            return anomalies
+
+        # Out of order: starts earlier than some event listed above it
+        start_s = self.start[idx].astype(np.int64)
+        running_max = np.maximum.accumulate(start_s)
+        for j in np.flatnonzero(start_s[1:] < running_max[:-1]) + 1:
+            i = idx[j]
+            anomalies.append(self._anomaly(
+                "Out of Order", f"'{self.records[i].event_name}' is listed after a later event", rows[i]
+            ))
+
+        # Overlaps and gaps are measured in chronological order
+        order = idx[np.argsort(start_s, kind="stable")]
+        start_sorted = self.start[order].astype(np.int64)
+        end = self.end[order]
+        end_sorted = np.where(np.isnat(end), start_sorted, end.astype(np.int64))
+        covered_until = np.maximum.accumulate(np.maximum(end_sorted, start_sorted))[:-1]
+        next_start = start_sorted[1:]
+
+        overlaps = np.flatnonzero(next_start < covered_until) + 1
+        for j in overlaps:
+            i = order[j]
+            anomalies.append(self._anomaly(
+                "Overlap", f"'{self.records[i].event_name}' starts before the previous event ends", rows[i]
+            ))
+
+        gaps = next_start - covered_until
+        for j in np.flatnonzero(gaps > gap_minutes * 60) + 1:
+            i = order[j]
+            hours = gaps[j - 1] / 3600
+            anomalies.append(self._anomaly(
+                "Time Gap", f"{hours:.1f} hour gap before '{self.records[i].event_name}'", rows[i]
+            ))
+
+        return anomalies
+
+    @staticmethod
+    def _parse_timestamps(values: List[Optional[str]]) -> np.ndarray:
+        """Parse ISO 8601 strings in one pass to naive-UTC datetime64[s]; invalid -> NaT"""
+        if not values:
+            return np.array([], dtype="datetime64[s]")
+        parsed = pd.to_datetime(
+            pd.Series(values, dtype="object"), utc=True, errors="coerce", format="ISO8601"
+        )
+        return parsed.dt.tz_convert(None).to_numpy().astype("datetime64[s]")
+
+    @staticmethod
+    def _format_timestamps(values: np.ndarray) -> List[Optional[str]]:
+        text = np.datetime_as_string(values, unit="s")
+        return [None if t == "NaT" else t + "Z" for t in text]
+
+    @staticmethod
+    def _duration(record: SofEventRecord, end: np.datetime64, computed: float) -> Optional[int]:
+        """Duration from the timestamps, or the supplied one when there is no end time"""
+        if np.isnat(end):
+            # Extractors sometimes supply text ("2 hrs") or fractions here
+            try:
+                return int(round(float(record.duration_minutes)))
+            except (TypeError, ValueError, OverflowError):
+                return None
+        return None if np.isnan(computed) else int(computed)
+
+    @staticmethod
+    def _anomaly(kind: str, message: str, row_index) -> Dict[str, Any]:
+        return {"type": kind, "message": message, "row_index": row_index}
\ No newline at end of file
@@ -0,0 +1,245 @@
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import textwrap
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+import aiofiles
+from ..core.config import settings
+
+# Cache modes accepted by AIService calls
+CACHE_USE = "use"          # serve from cache, store on miss
+CACHE_REFRESH = "refresh"  # skip lookup, call the API and overwrite the entry
+CACHE_BYPASS = "bypass"    # neither read nor write the cache
+
+CACHE_MODES = (CACHE_USE, CACHE_REFRESH, CACHE_BYPASS)
+
+
+class LLMResponseCache:
+    """Two-tier LLM response cache: in-memory LRU in front of disk or Redis"""
+
+    def __init__(
+        self,
+        backend: str = "disk",
+        max_entries: int = 512,
+        ttl_seconds: int = 7 * 24 * 3600,
+        cache_dir: str = "cache/llm",
+        redis_url: Optional[str] = None,
+        max_temperature: float = 0.2,
+        enabled: bool = True
+    ):
+        if backend not in ("memory", "disk", "redis"):
+            raise ValueError(f"Unsupported LLM cache backend: {backend}")
+
+        self.backend = backend
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = cache_dir
+        self.redis_url = redis_url
+        self.max_temperature = max_temperature
+        self.enabled = enabled
+
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._redis = None
+        self._metrics = {
+            "memory_hits": 0,
+            "backend_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "bypassed": 0,
+            "refreshed": 0,
+            "writes": 0,
+            "backend_errors": 0
+        }
+
+    @classmethod
+    def from_settings(cls) -> "LLMResponseCache":
+        return cls(
+            backend=settings.LLM_CACHE_BACKEND,
+            max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+            cache_dir=settings.LLM_CACHE_DIR,
+            redis_url=settings.REDIS_URL,
+            max_temperature=settings.LLM_CACHE_MAX_TEMPERATURE,
+            enabled=settings.LLM_CACHE_ENABLED
+        )
+
+    @staticmethod
+    def make_key(prompt: str, model: str, temperature: float, max_tokens: int) -> str:
+        """Hash of the prompt plus generation parameters"""
+        # Normalize common indentation and trailing whitespace only; line breaks
+        # and relative indentation are part of the payload's layout
+        lines = textwrap.dedent(prompt).strip().splitlines()
+        normalized = "\n".join(line.rstrip() for line in lines)
+        material = json.dumps(
+            [normalized, model, round(float(temperature), 4), int(max_tokens)],
+            separators=(',', ':')
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, temperature: float) -> bool:
+        """Only near-deterministic sampling settings are safe to replay"""
+        return self.enabled and temperature <= self.max_temperature
+
+    async def get_or_fetch(self, key: str, fetch, mode: str = CACHE_USE) -> Dict[str, Any]:
+        """Return the cached response for key, calling fetch() on a miss"""
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unsupported cache mode: {mode}")
+
+        if mode == CACHE_BYPASS:
+            self._metrics["bypassed"] += 1
+            return await fetch()
+
+        if mode == CACHE_USE:
+            cached = await self._lookup(key)
+            if cached is not None:
+                return copy.deepcopy(cached)
+
+            # Identical concurrent requests share a single upstream call
+            pending = self._inflight.get(key)
+            if pending is not None:
+                self._metrics["coalesced"] += 1
+                return copy.deepcopy(await asyncio.shield(pending))
+            self._metrics["misses"] += 1
+        else:
+            self._metrics["refreshed"] += 1
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await fetch()
+            await self.set(key, copy.deepcopy(value))
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so waiter-less failures are not logged as unhandled
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = await self._lookup(key)
+        if value is None:
+            self._metrics["misses"] += 1
+        return value
+
+    async def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Memory then backend lookup; counts hits, leaves misses to the caller"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.time():
+                self._memory.move_to_end(key)
+                self._metrics["memory_hits"] += 1
+                return value
+            del self._memory[key]
+
+        entry = await self._backend_get(key)
+        if entry is not None and entry[0] > time.time():
+            self._remember(key, entry[0], entry[1])
+            self._metrics["backend_hits"] += 1
+            return entry[1]
+
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any]):
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, expires_at, value)
+        await self._backend_set(key, expires_at, value)
+        self._metrics["writes"] += 1
+
+    async def invalidate(self, key: str):
+        self._memory.pop(key, None)
+        try:
+            if self.backend == "disk":
+                path = self._disk_path(key)
+                if os.path.exists(path):
+                    os.remove(path)
+            elif self.backend == "redis":
+                redis = await self._get_redis()
+                await redis.delete(self._redis_key(key))
+        except Exception:
+            self._metrics["backend_errors"] += 1
+
+    def clear_memory(self):
+        self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self._metrics["memory_hits"] + self._metrics["backend_hits"]
+        lookups = hits + self._metrics["coalesced"] + self._metrics["misses"]
+        # Coalesced lookups waited on another caller's request, so they cost no upstream call either
+        served = hits + self._metrics["coalesced"]
+        return {
+            **self._metrics,
+            "hits": hits,
+            "lookups": lookups,
+            "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "backend": self.backend
+        }
+
+    def _remember(self, key: str, expires_at: float, value: Dict[str, Any]):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def _backend_get(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        # The backend tier is best effort: failures degrade to a cache miss
+        try:
+            if self.backend == "disk":
+                path = self._disk_path(key)
+                if not os.path.exists(path):
+                    return None
+                async with aiofiles.open(path, 'r', encoding='utf-8') as f:
+                    entry = json.loads(await f.read())
+                return entry["expires_at"], entry["value"]
+
+            if self.backend == "redis":
+                redis = await self._get_redis()
+                raw = await redis.get(self._redis_key(key))
+                if raw is None:
+                    return None
+                entry = json.loads(raw)
+                return entry["expires_at"], entry["value"]
+        except Exception:
+            self._metrics["backend_errors"] += 1
+        return None
+
+    async def _backend_set(self, key: str, expires_at: float, value: Dict[str, Any]):
+        payload = json.dumps({"expires_at": expires_at, "value": value}, ensure_ascii=False)
+        try:
+            if self.backend == "disk":
+                path = self._disk_path(key)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                async with aiofiles.open(tmp_path, 'w', encoding='utf-8') as f:
+                    await f.write(payload)
+                os.replace(tmp_path, path)
+            elif self.backend == "redis":
+                redis = await self._get_redis()
+                await redis.set(self._redis_key(key), payload, ex=self.ttl_seconds)
+        except Exception:
+            self._metrics["backend_errors"] += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    @staticmethod
+    def _redis_key(key: str) -> str:
+        return f"llm_cache:{key}"
+
+    async def _get_redis(self):
+        if self._redis is None:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(self.redis_url)
+        return self._redis
+
+
+llm_cache = LLMResponseCache.from_settings()
\ No newline at end of file
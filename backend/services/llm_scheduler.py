@@ -0,0 +1,292 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Any, Deque, Optional
+from ..core.config import settings
+
+# Priority classes, lower value is served first
+PRIORITIES = {
+    "interactive": 0,  # user-facing uploads and generation
+    "batch": 1         # reprocessing and background jobs
+}
+
+
+class RateLimitedError(Exception):
+    """Raised when the upstream API answers 429"""
+
+    def __init__(self, retry_after: float, detail: str = ""):
+        super().__init__(f"AI API rate limited, retry after {retry_after:.1f}s {detail}".strip())
+        self.retry_after = retry_after
+
+
+class LocalRateLimiter:
+    """In-process requests/tokens per minute bucket, stand-in for the Redis limiter"""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+    async def try_acquire(self, tokens: int) -> float:
+        """Take one request and `tokens` tokens; return 0 or the seconds to wait"""
+        now = time.monotonic()
+        if self._blocked_until > now:
+            return self._blocked_until - now
+
+        self._refill(now)
+        cost = min(tokens, self.tpm)
+        wait = 0.0
+        if self._requests < 1:
+            wait = (1 - self._requests) * 60.0 / self.rpm
+        if self._tokens < cost:
+            wait = max(wait, (cost - self._tokens) * 60.0 / self.tpm)
+        if wait == 0:
+            self._requests -= 1
+            self._tokens -= cost
+        return wait
+
+    async def adjust(self, tokens: int):
+        """Correct the token bucket once actual usage is known (negative refunds)"""
+        self._refill(time.monotonic())
+        self._tokens = min(float(self.tpm), self._tokens - tokens)
+
+    async def block(self, seconds: float):
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def _refill(self, now: float):
+        elapsed = max(0.0, now - self._updated)
+        self._requests = min(float(self.rpm), self._requests + elapsed * self.rpm / 60.0)
+        self._tokens = min(float(self.tpm), self._tokens + elapsed * self.tpm / 60.0)
+        self._updated = now
+
+
+# Shared bucket kept in a Redis hash so every worker draws from the same budget
+_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local cost = math.min(tonumber(ARGV[3]), tpm)
+local b = redis.call('HMGET', KEYS[1], 'req', 'tok', 'ts', 'blocked_until')
+local req = tonumber(b[1]) or rpm
+local tok = tonumber(b[2]) or tpm
+local ts = tonumber(b[3]) or now
+local blocked = tonumber(b[4]) or 0
+if blocked > now then
+    return tostring(blocked - now)
+end
+local elapsed = math.max(0, now - ts)
+req = math.min(rpm, req + elapsed * rpm / 60)
+tok = math.min(tpm, tok + elapsed * tpm / 60)
+local wait = 0
+if req < 1 then
+    wait = (1 - req) * 60 / rpm
+end
+if tok < cost then
+    wait = math.max(wait, (cost - tok) * 60 / tpm)
+end
+if wait == 0 then
+    req = req - 1
+    tok = tok - cost
+end
+redis.call('HSET', KEYS[1], 'req', req, 'tok', tok, 'ts', now)
+redis.call('EXPIRE', KEYS[1], 300)
+return tostring(wait)
+"""
+
+_ADJUST_SCRIPT = """
+local tpm = tonumber(ARGV[1])
+local tok = tonumber(redis.call('HGET', KEYS[1], 'tok')) or tpm
+redis.call('HSET', KEYS[1], 'tok', math.min(tpm, tok - tonumber(ARGV[2])))
+return 1
+"""
+
+_BLOCK_SCRIPT = """
+local t = redis.call('TIME')
+local until_ts = tonumber(t[1]) + tonumber(t[2]) / 1000000 + tonumber(ARGV[1])
+local current = tonumber(redis.call('HGET', KEYS[1], 'blocked_until')) or 0
+if until_ts > current then
+    redis.call('HSET', KEYS[1], 'blocked_until', until_ts)
+end
+return 1
+"""
+
+
+class RedisRateLimiter:
+    """Requests/tokens per minute bucket shared across processes through Redis"""
+
+    def __init__(self, rpm: int, tpm: int, redis_url: str, key: str = "llm_rate_limit"):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.redis_url = redis_url
+        self.key = key
+        self._redis = None
+
+    async def try_acquire(self, tokens: int) -> float:
+        redis = await self._get_redis()
+        wait = await redis.eval(_ACQUIRE_SCRIPT, 1, self.key, self.rpm, self.tpm, tokens)
+        return float(wait)
+
+    async def adjust(self, tokens: int):
+        redis = await self._get_redis()
+        await redis.eval(_ADJUST_SCRIPT, 1, self.key, self.tpm, tokens)
+
+    async def block(self, seconds: float):
+        redis = await self._get_redis()
+        await redis.eval(_BLOCK_SCRIPT, 1, self.key, seconds)
+
+    async def _get_redis(self):
+        if self._redis is None:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(self.redis_url)
+        return self._redis
+
+
+class _Waiter:
+    __slots__ = ("future", "tokens", "enqueued_at")
+
+    def __init__(self, future: asyncio.Future, tokens: int):
+        self.future = future
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+
+
+class LLMScheduler:
+    """Priority queue with per-tenant fair queuing in front of the rate limiter.
+
+    Waiters are granted strictly by priority class; within a class, tenants
+    are served round-robin so one tenant's burst cannot starve the others.
+    """
+
+    def __init__(self, limiter, wait_samples: int = 512):
+        self.limiter = limiter
+        self._queues: Dict[int, "OrderedDict[str, Deque[_Waiter]]"] = {
+            level: OrderedDict() for level in sorted(PRIORITIES.values())
+        }
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._wait_times: Deque[float] = deque(maxlen=wait_samples)
+        self._metrics = {
+            "granted": 0,
+            "cancelled": 0,
+            "throttled": 0
+        }
+
+    @classmethod
+    def from_settings(cls) -> "LLMScheduler":
+        if settings.LLM_SCHEDULER_BACKEND == "redis":
+            limiter = RedisRateLimiter(settings.LLM_RPM_LIMIT, settings.LLM_TPM_LIMIT, settings.REDIS_URL)
+        elif settings.LLM_SCHEDULER_BACKEND == "local":
+            limiter = LocalRateLimiter(settings.LLM_RPM_LIMIT, settings.LLM_TPM_LIMIT)
+        else:
+            raise ValueError(f"Unsupported LLM scheduler backend: {settings.LLM_SCHEDULER_BACKEND}")
+        return cls(limiter)
+
+    async def acquire(self, tokens: int, priority: str = "interactive", tenant: str = "default"):
+        """Wait until a request of `tokens` estimated tokens may be sent"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unsupported priority: {priority}")
+
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(loop.create_future(), tokens)
+        tenants = self._queues[PRIORITIES[priority]]
+        tenants.setdefault(tenant, deque()).append(waiter)
+
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = loop.create_task(self._dispatch())
+        self._wakeup.set()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            self._metrics["cancelled"] += 1
+            raise
+
+    async def report_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Reconcile the token bucket with the usage the API reported"""
+        if actual_tokens is not None and actual_tokens != estimated_tokens:
+            await self.limiter.adjust(actual_tokens - estimated_tokens)
+
+    async def throttle(self, retry_after: float):
+        """Pause all dispatching after the upstream answered 429"""
+        self._metrics["throttled"] += 1
+        await self.limiter.block(retry_after)
+
+    def metrics(self) -> Dict[str, Any]:
+        names = {level: name for name, level in PRIORITIES.items()}
+        depth = {
+            names[level]: sum(len(q) for q in tenants.values())
+            for level, tenants in self._queues.items()
+        }
+        waits = sorted(self._wait_times)
+        return {
+            **self._metrics,
+            "queue_depth": depth,
+            "queued_total": sum(depth.values()),
+            "queued_tenants": sum(len(tenants) for tenants in self._queues.values()),
+            "wait_seconds": {
+                "samples": len(waits),
+                "mean": round(sum(waits) / len(waits), 4) if waits else 0.0,
+                "p95": round(waits[int(0.95 * (len(waits) - 1))], 4) if waits else 0.0,
+                "max": round(waits[-1], 4) if waits else 0.0
+            }
+        }
+
+    def _next_waiter(self):
+        """Head waiter of the highest non-empty priority and its tenant queue"""
+        for tenants in self._queues.values():
+            while tenants:
+                tenant, queue = next(iter(tenants.items()))
+                while queue and queue[0].future.done():
+                    queue.popleft()  # cancelled while waiting
+                if queue:
+                    return tenants, tenant, queue
+                del tenants[tenant]
+        return None
+
+    async def _dispatch(self):
+        while True:
+            head = self._next_waiter()
+            if head is None:
+                return
+            tenants, tenant, queue = head
+            waiter = queue[0]
+
+            try:
+                wait = await self.limiter.try_acquire(waiter.tokens)
+            except Exception as e:
+                # Limiter unavailable: fail this waiter instead of stalling the queue
+                queue.popleft()
+                if not waiter.future.done():
+                    waiter.future.set_exception(e)
+                continue
+            if wait > 0:
+                # Wake early if a higher priority waiter arrives meanwhile
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(wait, 1.0))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            queue.popleft()
+            # Round-robin: the served tenant goes to the back of its class
+            tenants.move_to_end(tenant)
+            if not queue:
+                del tenants[tenant]
+
+            if waiter.future.done():
+                # Cancelled after the bucket was charged; give the budget back
+                await self.limiter.adjust(-waiter.tokens)
+                continue
+
+            self._wait_times.append(time.monotonic() - waiter.enqueued_at)
+            self._metrics["granted"] += 1
+            waiter.future.set_result(None)
+
+
+llm_scheduler = LLMScheduler.from_settings()
\ No newline at end of file
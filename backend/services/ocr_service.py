@@ -1,68 +1,148 @@
-import pytesseract
-from PIL import Image
 import cv2
 import numpy as np
-import pdf2image
-from pathlib import Path
+import csv
+import os
+import re
+import subprocess
 import asyncio
 import io
-from typing import List, Optional
+from typing import List, Optional, Dict, Any, Tuple
 from ..core.config import settings
+from .document_source import DocumentSource
 
 class OCRService:
     def __init__(self):
-        if settings.TESSERACT_PATH:
-            pytesseract.pytesseract.tesseract_cmd = settings.TESSERACT_PATH
+        self.tesseract_cmd = settings.TESSERACT_PATH or "tesseract"
+        self.pdftoppm_cmd = os.path.join(settings.POPPLER_PATH, "pdftoppm") if settings.POPPLER_PATH else "pdftoppm"
+        self.pdfinfo_cmd = os.path.join(settings.POPPLER_PATH, "pdfinfo") if settings.POPPLER_PATH else "pdfinfo"
     
-    async def extract_text_from_pdf(self, pdf_path: str) -> str:
-        """Extract text from PDF using OCR"""
+    async def extract_text_from_pdf(self, source: DocumentSource, pages: Optional[List[int]] = None) -> str:
+        """Extract text from PDF using OCR, optionally only from the given 1-based pages"""
+        # Rasterization and Tesseract are CPU-bound; keep them off the event loop
+        return await asyncio.to_thread(self._extract_text_from_pdf_sync, source, pages)
+    
+    def _extract_text_from_pdf_sync(self, source: DocumentSource, pages: Optional[List[int]] = None) -> str:
+        extracted_text = ""
+        for page_number, page_text in self._ocr_pages_sync(source, pages).items():
+            extracted_text += f"\n--- Page {page_number} ---\n{page_text}\n"
+        return extracted_text.strip()
+    
+    async def ocr_pages(self, source: DocumentSource, pages: Optional[List[int]] = None) -> Dict[int, str]:
+        """Full-DPI OCR text keyed by 1-based page number"""
+        return await asyncio.to_thread(self._ocr_pages_sync, source, pages)
+    
+    def _ocr_pages_sync(self, source: DocumentSource, pages: Optional[List[int]] = None) -> Dict[int, str]:
         try:
-            # Convert PDF to images
-            images = pdf2image.convert_from_path(pdf_path)
+            # Convert PDF to grayscale page arrays
+            if pages is None:
+                rendered = enumerate(self.rasterize_pdf(source, dpi=settings.OCR_DPI), start=1)
+            else:
+                rendered = self.rasterize_pages(source, pages, dpi=settings.OCR_DPI)
             
-            extracted_text = ""
-            for i, image in enumerate(images):
+            page_texts = {}
+            for page_number, page in rendered:
                 # Preprocess image for better OCR
-                processed_image = await self._preprocess_image(image)
+                processed = self._preprocess(page)
                 
                 # Extract text using Tesseract
-                page_text = pytesseract.image_to_string(
-                    processed_image,
-                    lang=settings.OCR_LANGUAGES,
-                    config='--psm 6'
-                )
-                
-                extracted_text += f"\n--- Page {i+1} ---\n{page_text}\n"
+                page_texts[page_number] = self._run_tesseract(processed, "--psm", "6")
             
-            return extracted_text.strip()
+            return page_texts
             
         except Exception as e:
             raise Exception(f"OCR extraction failed: {str(e)}")
     
+    async def ocr_thumbnails(self, source: DocumentSource, pages: Optional[List[int]] = None) -> Dict[int, str]:
+        """Rough per-page text from a low-DPI pass without preprocessing, for relevance checks"""
+        return await asyncio.to_thread(self._ocr_thumbnails_sync, source, pages)
+    
+    def _ocr_thumbnails_sync(self, source: DocumentSource, pages: Optional[List[int]] = None) -> Dict[int, str]:
+        try:
+            dpi = settings.PAGE_FILTER_THUMBNAIL_DPI
+            if pages is None:
+                rendered = enumerate(self.rasterize_pdf(source, dpi=dpi), start=1)
+            else:
+                rendered = self.rasterize_pages(source, pages, dpi=dpi)
+            return {page_number: self._run_tesseract(page) for page_number, page in rendered}
+        except Exception as e:
+            raise Exception(f"Thumbnail OCR failed: {str(e)}")
+    
+    def rasterize_pages(self, source: DocumentSource, pages: List[int], dpi: int = 200) -> List[Tuple[int, np.ndarray]]:
+        """Render only the given 1-based pages, one pdftoppm call per consecutive run"""
+        rendered = []
+        runs = []
+        for page in sorted(set(pages)):
+            if runs and page == runs[-1][1] + 1:
+                runs[-1][1] = page
+            else:
+                runs.append([page, page])
+        for first, last in runs:
+            images = self.rasterize_pdf(source, dpi=dpi, first_page=first, last_page=last)
+            rendered.extend(zip(range(first, last + 1), images))
+        return rendered
+    
+    def rasterize_pdf(
+        self,
+        source: DocumentSource,
+        dpi: int = 200,
+        first_page: Optional[int] = None,
+        last_page: Optional[int] = None
+    ) -> List[np.ndarray]:
+        """Render PDF pages to grayscale arrays without intermediate image files.
+
+        In-memory documents are piped to pdftoppm over stdin; its PGM output is
+        read from stdout and the returned arrays are views into that buffer.
+        """
+        args = [self.pdftoppm_cmd, "-gray", "-r", str(dpi)]
+        if first_page:
+            args += ["-f", str(first_page)]
+        if last_page:
+            args += ["-l", str(last_page)]
+        args.append("-" if source.in_memory else source.path)
+        
+        proc = subprocess.run(args, input=source.data, capture_output=True)
+        if proc.returncode != 0:
+            raise Exception(f"PDF rasterization failed: {proc.stderr.decode(errors='replace').strip()}")
+        
+        return _parse_pnm_stream(memoryview(proc.stdout))
+    
+    def page_count(self, source: DocumentSource) -> Optional[int]:
+        """Page count from poppler's pdfinfo, for PDFs PyPDF2 cannot parse; None if unknown"""
+        args = [self.pdfinfo_cmd, "-" if source.in_memory else source.path]
+        try:
+            proc = subprocess.run(args, input=source.data, capture_output=True)
+        except OSError:
+            return None
+        match = re.search(rb"^Pages:\s+(\d+)", proc.stdout, re.MULTILINE)
+        if proc.returncode != 0 or not match:
+            return None
+        return int(match.group(1))
+    
     async def extract_text_from_image(self, image_path: str) -> str:
         """Extract text from image file"""
         try:
-            image = Image.open(image_path)
-            processed_image = await self._preprocess_image(image)
+            image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+            if image is None:
+                raise ValueError(f"Could not read image: {image_path}")
+            processed = await self._preprocess_image(image)
             
-            text = pytesseract.image_to_string(
-                processed_image,
-                lang=settings.OCR_LANGUAGES,
-                config='--psm 6'
-            )
+            text = await asyncio.to_thread(self._run_tesseract, processed, "--psm", "6")
             
             return text.strip()
             
         except Exception as e:
             raise Exception(f"Image OCR failed: {str(e)}")
     
-    async def _preprocess_image(self, image: Image.Image) -> Image.Image:
+    async def _preprocess_image(self, image: np.ndarray) -> np.ndarray:
         """Preprocess image for better OCR accuracy"""
-        # Convert PIL image to OpenCV format
-        opencv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(opencv_image, cv2.COLOR_BGR2GRAY)
+        return await asyncio.to_thread(self._preprocess, image)
+    
+    def _preprocess(self, image: np.ndarray) -> np.ndarray:
+        # Rasterized pages are already grayscale; convert anything else
+        if image.ndim == 3:
+            gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        else:
+            gray = image
         
         # Apply denoising
         denoised = cv2.fastNlMeansDenoising(gray)
@@ -74,22 +154,45 @@ class OCRService:
         
         # Morphological operations to clean up
         kernel = np.ones((1, 1), np.uint8)
-        cleaned = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
+        return cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
+    
+    def _run_tesseract(self, image: np.ndarray, *args: str) -> str:
+        """Run Tesseract on a grayscale array, passing it as PGM over stdin"""
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        height, width = image.shape[:2]
+        header = f"P5\n{width} {height}\n255\n".encode("ascii")
         
-        # Convert back to PIL Image
-        return Image.fromarray(cleaned)
+        proc = subprocess.run(
+            [self.tesseract_cmd, "stdin", "stdout", "-l", settings.OCR_LANGUAGES, *args],
+            input=header + image.tobytes(),
+            capture_output=True
+        )
+        if proc.returncode != 0:
+            raise Exception(f"Tesseract failed: {proc.stderr.decode(errors='replace').strip()}")
+        return proc.stdout.decode("utf-8", errors="replace")
     
-    async def detect_document_structure(self, image_path: str) -> dict:
+    def _image_data(self, image: np.ndarray) -> Dict[str, List[Any]]:
+        """Word boxes and confidences from Tesseract's TSV output, keyed by column"""
+        tsv = self._run_tesseract(image, "tsv")
+        rows = list(csv.reader(io.StringIO(tsv), delimiter="\t", quoting=csv.QUOTE_NONE))
+        if not rows:
+            return {"text": [], "conf": []}
+        
+        header, body = rows[0], [r for r in rows[1:] if len(r) == len(rows[0])]
+        data = {column: [row[i] for row in body] for i, column in enumerate(header)}
+        for column in ("left", "top", "width", "height"):
+            data[column] = [int(v) for v in data.get(column, [])]
+        data["conf"] = [float(v) for v in data.get("conf", [])]
+        return data
+    
+    async def detect_document_structure(self, image: np.ndarray) -> dict:
         """Detect document structure and layout"""
+        return await asyncio.to_thread(self._detect_document_structure_sync, image)
+    
+    def _detect_document_structure_sync(self, image: np.ndarray) -> dict:
         try:
-            image = Image.open(image_path)
-            
             # Get detailed OCR data with bounding boxes
-            data = pytesseract.image_to_data(
-                image,
-                lang=settings.OCR_LANGUAGES,
-                output_type=pytesseract.Output.DICT
-            )
+            data = self._image_data(image)
             
             # Analyze structure
             structure = {
@@ -144,4 +247,44 @@ class OCRService:
             return output_path
             
         except Exception as e:
-            raise Exception(f"Image enhancement failed: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Image enhancement failed: {str(e)}")
+
+
+def _parse_pnm_stream(buffer: memoryview) -> List[np.ndarray]:
+    """Split concatenated binary PGM/PPM images into arrays that view the buffer"""
+    images = []
+    pos = 0
+    end = len(buffer)
+    while pos < end:
+        fields = []
+        while len(fields) < 4:
+            # Skip whitespace and comments between header fields
+            while pos < end and buffer[pos] in b" \t\r\n":
+                pos += 1
+            if pos < end and buffer[pos] == ord("#"):
+                while pos < end and buffer[pos] not in b"\r\n":
+                    pos += 1
+                continue
+            token_start = pos
+            while pos < end and buffer[pos] not in b" \t\r\n":
+                pos += 1
+            if token_start == pos:
+                break
+            fields.append(bytes(buffer[token_start:pos]))
+        if not fields:
+            break
+        if len(fields) < 4 or fields[0] not in (b"P5", b"P6"):
+            raise ValueError("Malformed PNM stream from pdftoppm")
+        
+        # Exactly one whitespace byte separates the header from the pixels
+        pos += 1
+        width, height, maxval = int(fields[1]), int(fields[2]), int(fields[3])
+        if maxval > 255:
+            raise ValueError("16-bit PNM output is not supported")
+        channels = 1 if fields[0] == b"P5" else 3
+        size = width * height * channels
+        pixels = np.frombuffer(buffer[pos:pos + size], dtype=np.uint8)
+        shape = (height, width) if channels == 1 else (height, width, channels)
+        images.append(pixels.reshape(shape))
+        pos += size
+    return images
\ No newline at end of file
@@ -0,0 +1,106 @@
+import re
+from typing import List, Dict, Optional, Tuple
+from ..core.config import settings
+
+
+class PageRangeError(ValueError):
+    """Raised for malformed page ranges or ranges outside the document"""
+
+
+_RANGE_PART = re.compile(r"(\d+)\s*(?:(-)\s*(\d*))?")
+
+# Without a page count nothing clips the ranges, so bound what a request can ask for
+MAX_PAGES_WITHOUT_COUNT = 500
+
+
+def parse_page_ranges(spec: str) -> List[Tuple[int, Optional[int]]]:
+    """Parse "1-3,7,10-" into 1-based inclusive (start, end) ranges; end None is open"""
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        match = _RANGE_PART.fullmatch(part)
+        if not match:
+            raise PageRangeError(f"Invalid page range: '{part}'")
+
+        start = int(match.group(1))
+        if match.group(2) is None:
+            end = start
+        else:
+            end = int(match.group(3)) if match.group(3) else None
+        if start < 1 or (end is not None and end < start):
+            raise PageRangeError(f"Invalid page range: '{part}'")
+        ranges.append((start, end))
+
+    if not ranges:
+        raise PageRangeError("Page range is empty")
+    return ranges
+
+
+def select_pages(ranges: List[Tuple[int, Optional[int]]], total_pages: Optional[int]) -> List[int]:
+    """Sorted page numbers covered by the ranges, clipped to the document length"""
+    pages = set()
+    for start, end in ranges:
+        if end is None:
+            if total_pages is None:
+                raise PageRangeError("Open-ended page range needs a readable page count")
+            end = total_pages
+        if total_pages is not None:
+            end = min(end, total_pages)
+        if total_pages is None and end - start + 1 > MAX_PAGES_WITHOUT_COUNT - len(pages):
+            raise PageRangeError(
+                f"Page count is unknown; ranges may cover at most {MAX_PAGES_WITHOUT_COUNT} pages"
+            )
+        pages.update(range(start, end + 1))
+
+    if not pages:
+        raise PageRangeError(f"Page range is outside the document ({total_pages} pages)")
+    return sorted(pages)
+
+
+# Weights are per match; noise terms mark the crew lists, manifests and
+# certificates that make up most of a port pack
+_SOF_TERMS = [
+    (re.compile(r"statement\s+of\s+facts?|\bs\.o\.f\b|time\s+sheet|laytime"), 4.0),
+    (re.compile(r"notice\s+of\s+readiness|\bn\.?o\.?r\.?\s+(?:tendered|accepted)"), 2.0),
+    (re.compile(
+        r"\b(?:arrived|anchored|berthed|all\s+fast|pilot\s+on\s+board|commenced|completed|resumed|"
+        r"stopped|suspended|sailed|departed|free\s+pratique|hoses?\s+(?:connected|disconnected)|"
+        r"loading|discharging|draft\s+survey)\b"
+    ), 0.5),
+]
+_NOISE_TERMS = [
+    (re.compile(
+        r"crew\s+list|cargo\s+manifest|certificate\s+of|bill\s+of\s+lading|date\s+of\s+birth|"
+        r"passport|seaman'?s\s+book|stowage\s+plan|mate'?s\s+receipt|ship'?s\s+stores"
+    ), 2.0),
+]
+_TIME_OF_DAY = re.compile(r"\b(?:[01]?\d|2[0-3])[:.]?[0-5]\d\s*(?:hrs?|hours|lt)\b|\b(?:[01]\d|2[0-3]):[0-5]\d\b")
+
+
+class PageRelevanceFilter:
+    """Cheap per-page check for Statement of Facts content.
+
+    Scores page text (native or from a low-DPI OCR pass) by SoF vocabulary and
+    time-of-day density, so only likely SoF pages go to full OCR and the LLM.
+    """
+
+    def __init__(self, min_score: Optional[float] = None):
+        self.min_score = settings.PAGE_FILTER_MIN_SCORE if min_score is None else min_score
+
+    def score(self, text: str) -> float:
+        text = text.lower()
+        score = 0.0
+        for pattern, weight in _SOF_TERMS:
+            score += weight * min(len(pattern.findall(text)), 10)
+        for pattern, weight in _NOISE_TERMS:
+            score -= weight * len(pattern.findall(text))
+        # Timestamped rows carry continuation pages whose headers are elsewhere
+        score += 0.25 * min(len(_TIME_OF_DAY.findall(text)), 24)
+        return score
+
+    def select(self, page_texts: Dict[int, str]) -> List[int]:
+        """Pages scoring at or above min_score; every page if none does"""
+        relevant = [page for page, text in sorted(page_texts.items()) if self.score(text) >= self.min_score]
+        return relevant or sorted(page_texts)
\ No newline at end of file
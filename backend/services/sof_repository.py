@@ -0,0 +1,317 @@
+import base64
+import json
+import re
+import time
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy import select, insert, text, func, or_, and_
+from ..core.config import settings
+from ..core.database import Base, get_engine, get_session
+from ..models.sof_records import SofDocumentRow, SofEventRow
+
+# First matching pattern wins, so the more specific types come first
+EVENT_TYPES = [
+    ("notice_of_readiness", r'notice.*readiness|\bnor\b|n\.o\.r'),
+    ("pilot", r'pilot|tug'),
+    ("berthing", r'berth|all fast|mooring|moored'),
+    ("arrival", r'arriv|anchor'),
+    ("cargo_operations", r'load|discharg|cargo|hatch'),
+    ("weather_delay", r'weather|rain|delay|waiting|stoppage'),
+    ("departure", r'sail|depart|unmoor|cast off'),
+    ("documentation", r'document|customs|clearance|inspection|survey|free pratique'),
+]
+_EVENT_TYPE_PATTERNS = [(name, re.compile(pattern)) for name, pattern in EVENT_TYPES]
+
+MAX_PAGE_SIZE = 200
+
+_DOCUMENT_LIST_COLUMNS = (
+    SofDocumentRow.id,
+    SofDocumentRow.filename,
+    SofDocumentRow.vessel_name,
+    SofDocumentRow.port_name,
+    SofDocumentRow.mode,
+    SofDocumentRow.file_size,
+    SofDocumentRow.total_events,
+    SofDocumentRow.created_at,
+)
+
+_schema_ready = False
+# Last failure to reach the database, as (monotonic time, message)
+_schema_error: Optional[Tuple[float, str]] = None
+
+
+def classify_event(event_name: str) -> str:
+    name = (event_name or "").lower()
+    for event_type, pattern in _EVENT_TYPE_PATTERNS:
+        if pattern.search(name):
+            return event_type
+    return "other"
+
+
+def normalize_name(value: Optional[str]) -> Optional[str]:
+    """Vessel and port names are stored upper-cased with collapsed whitespace"""
+    if not value or not value.strip():
+        return None
+    return " ".join(value.split()).upper()
+
+
+class SofRepository:
+    """Persistence and indexed search for processed SoF documents.
+
+    Methods are synchronous; call them from async code via asyncio.to_thread.
+    """
+
+    def __init__(self):
+        self._ensure_schema()
+
+    def save_result(
+        self,
+        result: Dict[str, Any],
+        raw_text: str,
+        vessel_name: Optional[str] = None,
+        port_name: Optional[str] = None
+    ) -> str:
+        """Store a /sof/process result, its full text and events in one transaction"""
+        vessel = normalize_name(vessel_name)
+        port = normalize_name(port_name)
+        document_id = result["processing_id"]
+        events = result.get("events", [])
+
+        rows = [
+            {
+                "document_id": document_id,
+                "vessel_name": vessel,
+                "port_name": port,
+                "event_name": event.get("event_name"),
+                "event_type": classify_event(event.get("event_name")),
+                "start_time": self._parse_iso(event.get("start_time_iso")),
+                "end_time": self._parse_iso(event.get("end_time_iso")),
+                "duration_minutes": self._as_int(event.get("duration_minutes")),
+                "page": self._as_int(event.get("page")),
+                "row_index": self._as_int(event.get("row_index")),
+                "confidence": event.get("confidence"),
+            }
+            for event in events
+        ]
+
+        with get_session() as session, session.begin():
+            session.add(SofDocumentRow(
+                id=document_id,
+                filename=result.get("filename", ""),
+                vessel_name=vessel,
+                port_name=port,
+                mode=result.get("stats", {}).get("mode", ""),
+                file_size=result.get("file_size", 0),
+                total_events=len(events),
+                raw_text=raw_text,
+                created_at=datetime.utcnow()
+            ))
+            session.flush()
+            if rows:
+                # Single executemany round trip for all events
+                session.execute(insert(SofEventRow), rows)
+            if session.bind.dialect.name == "sqlite":
+                session.execute(
+                    text("INSERT INTO sof_documents_fts (document_id, raw_text) VALUES (:id, :raw_text)"),
+                    {"id": document_id, "raw_text": raw_text}
+                )
+
+        return document_id
+
+    def get_document(self, document_id: str) -> Optional[Dict[str, Any]]:
+        with get_session() as session:
+            document = session.get(SofDocumentRow, document_id)
+            if document is None:
+                return None
+            events = session.scalars(
+                select(SofEventRow)
+                .where(SofEventRow.document_id == document_id)
+                .order_by(SofEventRow.row_index, SofEventRow.id)
+            ).all()
+
+            return {
+                **self._document_summary(document),
+                "raw_text": document.raw_text,
+                "events": [self._event_dict(e) for e in events]
+            }
+
+    def search_documents(
+        self,
+        vessel_name: Optional[str] = None,
+        port_name: Optional[str] = None,
+        query: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Dict[str, Any]:
+        """Newest-first document search with keyset cursor pagination"""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        stmt = select(*_DOCUMENT_LIST_COLUMNS)
+
+        if vessel_name:
+            stmt = stmt.where(SofDocumentRow.vessel_name == normalize_name(vessel_name))
+        if port_name:
+            stmt = stmt.where(SofDocumentRow.port_name == normalize_name(port_name))
+        if query and query.strip():
+            stmt = stmt.where(self._full_text_clause(query))
+        if cursor:
+            created_at, last_id = self._decode_cursor(cursor)
+            stmt = stmt.where(or_(
+                SofDocumentRow.created_at < created_at,
+                and_(SofDocumentRow.created_at == created_at, SofDocumentRow.id < last_id)
+            ))
+
+        stmt = stmt.order_by(SofDocumentRow.created_at.desc(), SofDocumentRow.id.desc()).limit(limit + 1)
+
+        with get_session() as session:
+            rows = session.execute(stmt).all()
+
+        page = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = self._encode_cursor(page[-1].created_at, page[-1].id)
+
+        return {
+            "items": [self._document_summary(row) for row in page],
+            "next_cursor": next_cursor
+        }
+
+    def search_events(
+        self,
+        vessel_name: Optional[str] = None,
+        port_name: Optional[str] = None,
+        event_type: Optional[str] = None,
+        start_from: Optional[datetime] = None,
+        start_to: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Dict[str, Any]:
+        """Chronological event search; events without a start time are not listed"""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        stmt = select(SofEventRow).where(SofEventRow.start_time.is_not(None))
+
+        if vessel_name:
+            stmt = stmt.where(SofEventRow.vessel_name == normalize_name(vessel_name))
+        if port_name:
+            stmt = stmt.where(SofEventRow.port_name == normalize_name(port_name))
+        if event_type:
+            stmt = stmt.where(SofEventRow.event_type == event_type)
+        if start_from:
+            stmt = stmt.where(SofEventRow.start_time >= self._naive_utc(start_from))
+        if start_to:
+            stmt = stmt.where(SofEventRow.start_time < self._naive_utc(start_to))
+        if cursor:
+            start_time, last_id = self._decode_cursor(cursor)
+            stmt = stmt.where(or_(
+                SofEventRow.start_time > start_time,
+                and_(SofEventRow.start_time == start_time, SofEventRow.id > int(last_id))
+            ))
+
+        stmt = stmt.order_by(SofEventRow.start_time, SofEventRow.id).limit(limit + 1)
+
+        with get_session() as session:
+            rows = session.scalars(stmt).all()
+
+        page = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = self._encode_cursor(page[-1].start_time, page[-1].id)
+
+        return {
+            "items": [self._event_dict(e) for e in page],
+            "next_cursor": next_cursor
+        }
+
+    def _full_text_clause(self, query: str):
+        if get_engine().dialect.name == "postgresql":
+            # Must match the indexed expression to use the GIN index
+            return func.to_tsvector('english', SofDocumentRow.raw_text).op('@@')(
+                func.plainto_tsquery('english', query)
+            )
+
+        # FTS5: quote every term so user input cannot inject query syntax
+        terms = " ".join('"%s"' % term.replace('"', '""') for term in query.split())
+        return SofDocumentRow.id.in_(
+            select(text("document_id")).select_from(text("sof_documents_fts"))
+            .where(text("sof_documents_fts MATCH :terms").bindparams(terms=terms))
+        )
+
+    @staticmethod
+    def _ensure_schema():
+        global _schema_ready, _schema_error
+        if _schema_ready:
+            return
+        # An unreachable database is not retried on every request
+        if _schema_error and time.monotonic() - _schema_error[0] < settings.SOF_STORE_RETRY_SECONDS:
+            raise Exception(f"SoF store unavailable: {_schema_error[1]}")
+        try:
+            Base.metadata.create_all(get_engine())
+        except Exception as e:
+            _schema_error = (time.monotonic(), str(e))
+            raise
+        _schema_ready = True
+        _schema_error = None
+
+    @staticmethod
+    def _document_summary(row) -> Dict[str, Any]:
+        return {
+            "document_id": row.id,
+            "filename": row.filename,
+            "vessel_name": row.vessel_name,
+            "port_name": row.port_name,
+            "mode": row.mode,
+            "file_size": row.file_size,
+            "total_events": row.total_events,
+            "created_at": row.created_at.isoformat() + "Z"
+        }
+
+    @staticmethod
+    def _event_dict(row: SofEventRow) -> Dict[str, Any]:
+        return {
+            "event_id": row.id,
+            "document_id": row.document_id,
+            "vessel_name": row.vessel_name,
+            "port_name": row.port_name,
+            "event_name": row.event_name,
+            "event_type": row.event_type,
+            "start_time_iso": row.start_time.isoformat() + "Z" if row.start_time else None,
+            "end_time_iso": row.end_time.isoformat() + "Z" if row.end_time else None,
+            "duration_minutes": row.duration_minutes,
+            "page": row.page,
+            "row_index": row.row_index,
+            "confidence": row.confidence
+        }
+
+    @staticmethod
+    def _encode_cursor(position: datetime, row_id) -> str:
+        raw = json.dumps([position.isoformat(), row_id], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[datetime, Any]:
+        try:
+            position, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            return datetime.fromisoformat(position), row_id
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor")
+
+    @staticmethod
+    def _parse_iso(value: Optional[str]) -> Optional[datetime]:
+        if not value:
+            return None
+        try:
+            return SofRepository._naive_utc(datetime.fromisoformat(value.replace('Z', '+00:00')))
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _naive_utc(value: datetime) -> datetime:
+        if value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    @staticmethod
+    def _as_int(value) -> Optional[int]:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
\ No newline at end of file
@@ -0,0 +1,84 @@
+import json
+import re
+from typing import List, Dict, Any
+
+
+class IncrementalEventParser:
+    """Incrementally pull complete objects out of a streamed {"events": [...]} reply.
+
+    Chunks are fed as they arrive from the LLM; every event object is returned
+    as soon as its closing brace is seen, without waiting for the full JSON.
+    """
+
+    def __init__(self, array_key: str = "events"):
+        self.array_key = array_key
+        self.buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._array_done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start = -1
+        self._key_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(array_key))
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Add a chunk and return any event objects completed by it"""
+        self.buffer += chunk
+        completed = []
+
+        if not self._in_array and not self._array_done:
+            # The preamble before the array is short, so rescanning it is cheap
+            match = self._key_pattern.search(self.buffer)
+            if not match:
+                return completed
+            self._in_array = True
+            self._pos = match.end()
+
+        while self._in_array and self._pos < len(self.buffer):
+            char = self.buffer[self._pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._object_start = self._pos
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    raw = self.buffer[self._object_start:self._pos + 1]
+                    try:
+                        completed.append(json.loads(raw))
+                    except json.JSONDecodeError:
+                        pass  # Skip malformed entries rather than stall the stream
+            elif char == "]" and self._depth == 0:
+                self._in_array = False
+                self._array_done = True
+
+            self._pos += 1
+
+        return completed
+
+    def finish(self) -> Dict[str, Any]:
+        """Parse the complete reply once the stream has ended"""
+        text = self.buffer.strip()
+        # Models sometimes wrap JSON in a markdown code fence
+        fenced = re.search(r'```(?:json)?\s*(.*?)```', text, re.DOTALL)
+        if fenced:
+            text = fenced.group(1)
+
+        start, end = text.find("{"), text.rfind("}")
+        if start == -1 or end == -1:
+            return {}
+        try:
+            return json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            return {}
\ No newline at end of file
@@ -0,0 +1,201 @@
+import re
+from typing import List, Dict, Any, Optional, Tuple
+from jinja2 import StrictUndefined, meta
+from jinja2.sandbox import SandboxedEnvironment
+
+# "[VESSEL_NAME]" style placeholders used by the base templates
+BRACKET_PLACEHOLDER = re.compile(r'\[([A-Z][A-Z0-9_ ]*[A-Z0-9])\]')
+
+# Numbered clause headings: "12.", "12)", "Clause 12", "CLAUSE 12:"
+CLAUSE_HEADING = re.compile(
+    r'^[ \t]*(?:clause[ \t]+(\d{1,3})[.):]?|(\d{1,3})[.)])(?=[ \t]|$)',
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Leading title of a negotiated clause, e.g. "Demurrage: ..." or "Ice Clause - ..."
+CLAUSE_TITLE = re.compile(r'^\s*(?:(?:clause\s+)?\d{1,3}\s*[.):]?\s*)?([A-Za-z][A-Za-z /&]{2,40}?)\s*[:\-–]', re.IGNORECASE)
+
+# Bare "{{ name }}" substitutions, the only jinja form filled when recap data is incomplete
+PLAIN_VARIABLE = re.compile(r'\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}')
+
+SPECIAL_CLAUSES_HEADING = "SPECIAL CLAUSES:"
+
+
+class TemplateMerger:
+    """Deterministic charter party template merge with change tracking"""
+
+    def __init__(self):
+        # Templates are user uploads, so render them sandboxed
+        self.env = SandboxedEnvironment(undefined=StrictUndefined, keep_trailing_newline=True, autoescape=False)
+
+    def merge_recap(self, template_content: str, recap_data: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+        """Fill recap placeholders in the template and return (content, changes)"""
+        values = self._placeholder_values(recap_data)
+        changes: List[Dict[str, Any]] = []
+        seen = set()
+
+        def track(field: str, original: str, new_value: str):
+            if original not in seen:
+                seen.add(original)
+                changes.append({
+                    "field": self._field_label(field),
+                    "original_value": original,
+                    "new_value": new_value,
+                    "source": "recap"
+                })
+
+        content = template_content
+        if "{{" in content or "{%" in content:
+            context = {**values, **{key.lower(): value for key, value in values.items()}}
+            content = self._render_jinja(template_content, context)
+
+            def fill(match: re.Match) -> str:
+                variable = match.group(1)
+                if variable not in context:
+                    return match.group(0)
+                return context[variable]
+
+            if content is None:
+                # Incomplete recap data or a template jinja cannot render:
+                # fill only bare variables and leave all other markup untouched
+                content = PLAIN_VARIABLE.sub(fill, template_content)
+            for variable in PLAIN_VARIABLE.findall(template_content):
+                if variable in context:
+                    track(variable.lower(), "{{ %s }}" % variable, context[variable])
+
+        def replace(match: re.Match) -> str:
+            key = match.group(1).replace(" ", "_")
+            if key not in values:
+                return match.group(0)
+            track(key.lower(), match.group(0), values[key])
+            return values[key]
+
+        content = BRACKET_PLACEHOLDER.sub(replace, content)
+        return content, changes
+
+    def _render_jinja(self, template_content: str, context: Dict[str, str]) -> Optional[str]:
+        """Full sandboxed render, or None unless every referenced variable is known"""
+        try:
+            ast = self.env.parse(template_content)
+            if not meta.find_undeclared_variables(ast) <= context.keys():
+                # Loops and filters over missing data would silently drop or mangle text
+                return None
+            return self.env.from_string(template_content).render(**context)
+        except Exception:
+            # Syntax errors, sandbox violations, undefined attributes, type errors
+            return None
+
+    def split_clauses(self, negotiated_clauses: str) -> List[str]:
+        """Split free-text negotiated clauses into individual clauses"""
+        text = (negotiated_clauses or "").strip()
+        if not text:
+            return []
+
+        starts = [m.start() for m in CLAUSE_HEADING.finditer(text)]
+        if not starts or starts[0] != 0:
+            starts.insert(0, 0)
+        pieces = [text[start:end] for start, end in zip(starts, starts[1:] + [len(text)])]
+
+        # Within a numbered piece, a blank-line block opens a new clause only
+        # when it carries its own title ("Ice: ..."); otherwise it continues
+        clauses: List[str] = []
+        for piece in pieces:
+            for i, block in enumerate(re.split(r'\n\s*\n', piece.strip())):
+                block = block.strip()
+                if not block:
+                    continue
+                if i == 0 or not clauses or CLAUSE_TITLE.match(block):
+                    clauses.append(block)
+                else:
+                    clauses[-1] += "\n\n" + block
+
+        return clauses
+
+    def index_sections(self, content: str) -> List[Dict[str, Any]]:
+        """Locate numbered clause sections in the merged template"""
+        matches = list(CLAUSE_HEADING.finditer(content))
+        sections = []
+        for i, match in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(content)
+            line_end = content.find("\n", match.start())
+            heading = content[match.start():line_end if line_end != -1 else end].strip()
+            sections.append({
+                "number": match.group(1) or match.group(2),
+                "heading": heading,
+                "start": match.start(),
+                "end": end
+            })
+        return sections
+
+    def match_section(self, clause: str, sections: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Find the template section a negotiated clause amends, by title then number"""
+        heading = CLAUSE_HEADING.match(clause)
+        number = (heading.group(1) or heading.group(2)) if heading else None
+        title = CLAUSE_TITLE.match(clause)
+
+        # Recap list numbers rarely follow the template's numbering, so the
+        # number is only trusted on its own when the clause has no title
+        if not title:
+            if number is None:
+                return None
+            return next((section for section in sections if section["number"] == number), None)
+
+        # Whole-word matches only ("ice" must not match "notice"); an exact
+        # title beats a heading that merely contains the words, and the clause
+        # number only breaks ties between headings that agree with the title
+        keyword = self._title_key(title.group(1))
+        pattern = re.compile(r'\b%s\b' % re.escape(keyword))
+        best, best_score = None, 0
+        for section in sections:
+            heading_title = self._title_key(CLAUSE_HEADING.sub("", section["heading"], count=1))
+            if heading_title == keyword:
+                score = 2
+            elif pattern.search(heading_title):
+                score = 1
+            else:
+                continue
+            if section["number"] == number:
+                score += 0.5
+            if score > best_score:
+                best, best_score = section, score
+        return best
+
+    def append_special_clauses(self, content: str, clauses: List[str]) -> str:
+        """Append clauses that do not amend an existing section"""
+        if not clauses:
+            return content
+        body = "\n\n".join(clauses)
+        if SPECIAL_CLAUSES_HEADING in content:
+            return content.rstrip() + "\n\n" + body + "\n"
+        return content.rstrip() + f"\n\n{SPECIAL_CLAUSES_HEADING}\n\n" + body + "\n"
+
+    def _placeholder_values(self, recap_data: Dict[str, Any]) -> Dict[str, str]:
+        """Map upper-case placeholder names to rendered recap values"""
+        values = {}
+        for key, value in (recap_data or {}).items():
+            if value is None or value == "" or value == []:
+                continue
+            if isinstance(value, (list, tuple)):
+                rendered = "; ".join(str(v) for v in value)
+            else:
+                rendered = str(value)
+
+            name = key.upper()
+            values[name] = rendered
+            # "laycan_start_iso" also fills "[LAYCAN_START]"
+            if name.endswith("_ISO"):
+                values.setdefault(name[:-4], rendered)
+        return values
+
+    @staticmethod
+    def _title_key(title: str) -> str:
+        """Lower-cased clause title without punctuation or a trailing "clause" """
+        words = re.findall(r'[a-z0-9]+', title.lower())
+        if len(words) > 1 and words[-1] == "clause":
+            words = words[:-1]
+        return " ".join(words)
+
+    @staticmethod
+    def _field_label(key: str) -> str:
+        key = key[:-4] if key.endswith("_iso") else key
+        return key.replace("_", " ").title()
\ No newline at end of file
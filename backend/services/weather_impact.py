@@ -0,0 +1,292 @@
+import numpy as np
+from typing import Dict, Any, List, Optional, Union
+
+ArrayLike = Union[float, List[float], np.ndarray]
+
+EARTH_RADIUS_NM = 3440.065
+
+# Per-segment weather fields and their defaults when missing from the input
+WEATHER_FIELDS = {
+    "wind_speed_kn": 0.0,
+    "wind_direction_deg": 0.0,
+    "wave_height_m": 0.0,
+    "wave_direction_deg": None,  # defaults to wind direction
+    "current_speed_kn": 0.0,
+    "current_direction_deg": 0.0,
+}
+
+RISK_LEVELS = [(0.3, "low"), (0.6, "moderate"), (0.85, "high")]
+
+MS_TO_KNOTS = 1.943844
+
+
+class WeatherImpactEngine:
+    """Vectorized weather impact scoring for route segments.
+
+    All inputs broadcast against each other, so a leading batch axis can be
+    used to evaluate many route/forecast/speed combinations in one pass.
+    Wind and wave directions are "coming from", current direction is "flowing to".
+    """
+
+    def __init__(
+        self,
+        wind_loss_coeff: float = 0.00025,
+        wave_loss_coeff: float = 0.012,
+        max_speed_loss: float = 0.6,
+        min_sog_kn: float = 0.5,
+        wind_risk_limit_kn: float = 48.0,
+        wave_risk_limit_m: float = 6.0
+    ):
+        self.wind_loss_coeff = wind_loss_coeff
+        self.wave_loss_coeff = wave_loss_coeff
+        self.max_speed_loss = max_speed_loss
+        self.min_sog_kn = min_sog_kn
+        self.wind_risk_limit_kn = wind_risk_limit_kn
+        self.wave_risk_limit_m = wave_risk_limit_m
+
+    def score_segments(
+        self,
+        vessel_speed_kn: ArrayLike,
+        distance_nm: ArrayLike,
+        heading_deg: ArrayLike,
+        wind_speed_kn: ArrayLike = 0.0,
+        wind_direction_deg: ArrayLike = 0.0,
+        wave_height_m: ArrayLike = 0.0,
+        wave_direction_deg: Optional[ArrayLike] = None,
+        current_speed_kn: ArrayLike = 0.0,
+        current_direction_deg: ArrayLike = 0.0
+    ) -> Dict[str, np.ndarray]:
+        """Compute speed loss, ETA delta and risk per segment (last axis)"""
+        stw = np.asarray(vessel_speed_kn, dtype=np.float64)
+        distance = np.asarray(distance_nm, dtype=np.float64)
+        heading = np.asarray(heading_deg, dtype=np.float64)
+        wind = np.asarray(wind_speed_kn, dtype=np.float64)
+        wind_dir = np.asarray(wind_direction_deg, dtype=np.float64)
+        wave = np.asarray(wave_height_m, dtype=np.float64)
+        wave_dir = wind_dir if wave_direction_deg is None else np.asarray(wave_direction_deg, dtype=np.float64)
+        current = np.asarray(current_speed_kn, dtype=np.float64)
+        current_dir = np.asarray(current_direction_deg, dtype=np.float64)
+
+        # Encounter angles: 0 = head on, pi = following
+        wind_rel = np.deg2rad(wind_dir - heading)
+        wave_rel = np.deg2rad(wave_dir - heading)
+
+        # Directional reduction: 1.0 head, 0.65 beam, 0.3 following
+        wind_factor = 0.65 + 0.35 * np.cos(wind_rel)
+        wave_factor = 0.65 + 0.35 * np.cos(wave_rel)
+
+        speed_loss = (
+            self.wind_loss_coeff * wind_factor * wind ** 2
+            + self.wave_loss_coeff * wave_factor * wave ** 2
+        )
+        speed_loss = np.clip(speed_loss, 0.0, self.max_speed_loss)
+
+        # Current component along track adds directly to speed over ground
+        current_along = current * np.cos(np.deg2rad(current_dir - heading))
+        sog = np.maximum(stw * (1.0 - speed_loss) + current_along, self.min_sog_kn)
+
+        base_hours = distance / np.maximum(stw, self.min_sog_kn)
+        hours = distance / sog
+        eta_delta_hours = hours - base_hours
+
+        # Beam seas add roll risk on top of raw wave height
+        wave_risk = (wave / self.wave_risk_limit_m) * (1.0 + 0.3 * np.abs(np.sin(wave_rel)))
+        wind_risk = wind / self.wind_risk_limit_kn
+        risk = np.clip(np.maximum(wave_risk, wind_risk), 0.0, 1.0)
+
+        shape = np.broadcast(stw, distance, heading, wind, wave, current).shape
+        return {
+            "speed_loss_pct": np.broadcast_to(speed_loss * 100.0, shape),
+            "sog_kn": np.broadcast_to(sog, shape),
+            "hours": np.broadcast_to(hours, shape),
+            "eta_delta_hours": np.broadcast_to(eta_delta_hours, shape),
+            "risk_score": np.broadcast_to(risk, shape),
+        }
+
+    def route_totals(self, scores: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Reduce per-segment scores to per-route totals along the last axis"""
+        hours = scores["hours"]
+        total_hours = hours.sum(axis=-1)
+        return {
+            "total_hours": total_hours,
+            "eta_delta_hours": scores["eta_delta_hours"].sum(axis=-1),
+            "mean_speed_loss_pct": (
+                (scores["speed_loss_pct"] * hours).sum(axis=-1) / np.maximum(total_hours, 1e-9)
+            ),
+            "max_risk_score": scores["risk_score"].max(axis=-1),
+        }
+
+    def evaluate(self, weather_data: Dict[str, Any], route_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Score a single route against its weather and return a JSON-ready summary"""
+        vessel_speed = float(route_data.get("vessel_speed", route_data.get("vessel_speed_kn", 12.0)))
+        distance, heading = self._route_geometry(route_data)
+        weather = self._weather_columns(weather_data, len(distance))
+
+        scores = self.score_segments(vessel_speed, distance, heading, **weather)
+        totals = self.route_totals(scores)
+        risk = scores["risk_score"]
+
+        segments = [
+            {
+                "segment": i + 1,
+                "distance_nm": round(float(distance[i]), 1),
+                "heading_deg": round(float(heading[i]), 1),
+                "speed_loss_pct": round(float(scores["speed_loss_pct"][i]), 1),
+                "sog_kn": round(float(scores["sog_kn"][i]), 2),
+                "eta_delta_hours": round(float(scores["eta_delta_hours"][i]), 2),
+                "risk_score": round(float(risk[i]), 2),
+                "risk_level": self.risk_level(float(risk[i]))
+            }
+            for i in range(len(distance))
+        ]
+
+        max_risk = float(totals["max_risk_score"]) if len(distance) else 0.0
+        return {
+            "vessel_speed_kn": vessel_speed,
+            "total_distance_nm": round(float(distance.sum()), 1),
+            "total_hours": round(float(totals["total_hours"]), 2),
+            "eta_delta_hours": round(float(totals["eta_delta_hours"]), 2),
+            "mean_speed_loss_pct": round(float(totals["mean_speed_loss_pct"]), 1),
+            "max_risk_score": round(max_risk, 2),
+            "risk_level": self.risk_level(max_risk),
+            "high_risk_segments": [s["segment"] for s in segments if s["risk_score"] >= RISK_LEVELS[1][0]],
+            "segments": segments,
+            "recommendations": self._recommendations(segments, max_risk)
+        }
+
+    def compare_speeds(
+        self,
+        weather_data: Dict[str, Any],
+        route_data: Dict[str, Any],
+        speeds_kn: ArrayLike
+    ) -> Dict[str, np.ndarray]:
+        """What-if evaluation of one route at many vessel speeds in a single pass"""
+        distance, heading = self._route_geometry(route_data)
+        weather = self._weather_columns(weather_data, len(distance))
+        speeds = np.asarray(speeds_kn, dtype=np.float64).reshape(-1, 1)
+
+        totals = self.route_totals(self.score_segments(speeds, distance, heading, **weather))
+        totals["vessel_speed_kn"] = speeds[:, 0]
+        return totals
+
+    @staticmethod
+    def risk_level(score: float) -> str:
+        for limit, level in RISK_LEVELS:
+            if score < limit:
+                return level
+        return "severe"
+
+    def _route_geometry(self, route_data: Dict[str, Any]):
+        """Return per-segment distance (nm) and heading (deg) arrays"""
+        if route_data.get("segments"):
+            segments = route_data["segments"]
+            distance = np.array([float(s.get("distance_nm", 0.0)) for s in segments])
+            heading = np.array([float(s.get("heading_deg", 0.0)) for s in segments])
+            return distance, heading
+
+        waypoints = route_data.get("waypoints") or []
+        if len(waypoints) < 2:
+            raise ValueError("Route data requires 'segments' or at least two 'waypoints'")
+
+        lat = np.deg2rad(np.array([float(w["lat"]) for w in waypoints]))
+        lon = np.deg2rad(np.array([float(w["lon"]) for w in waypoints]))
+        lat1, lat2 = lat[:-1], lat[1:]
+        dlon = lon[1:] - lon[:-1]
+
+        # Great-circle distance (haversine) and initial bearing
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+        distance = 2 * EARTH_RADIUS_NM * np.arcsin(np.sqrt(a))
+        heading = np.rad2deg(np.arctan2(
+            np.sin(dlon) * np.cos(lat2),
+            np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+        )) % 360.0
+        return distance, heading
+
+    def _weather_columns(self, weather_data: Dict[str, Any], n_segments: int) -> Dict[str, Any]:
+        """Normalize weather input (per-segment list or flat fields) into arrays"""
+        rows = weather_data.get("segments")
+        if rows:
+            rows = [self._normalize_weather(row) for row in rows]
+            present = any(field in row for row in rows for field in WEATHER_FIELDS)
+        else:
+            weather_data = self._normalize_weather(weather_data)
+            present = any(field in weather_data for field in WEATHER_FIELDS)
+        if not present:
+            raise ValueError(
+                "Weather data has none of the supported fields: " + ", ".join(WEATHER_FIELDS)
+            )
+        columns = {}
+
+        for field, default in WEATHER_FIELDS.items():
+            if rows:
+                if len(rows) != n_segments:
+                    raise ValueError(
+                        f"Weather data has {len(rows)} segments, route has {n_segments}"
+                    )
+                values = [row.get(field, default) for row in rows]
+                if default is None and all(v is None for v in values):
+                    continue
+                if default is None:
+                    wind_dir = [row.get("wind_direction_deg", 0.0) for row in rows]
+                    values = [w if v is None else v for v, w in zip(values, wind_dir)]
+                columns[field] = np.asarray(values, dtype=np.float64)
+            else:
+                value = weather_data.get(field, default)
+                if value is None:
+                    continue
+                columns[field] = np.asarray(value, dtype=np.float64)
+
+        return columns
+
+    @staticmethod
+    def _normalize_weather(record: Dict[str, Any]) -> Dict[str, Any]:
+        """Map OpenWeather-shaped records (nested wind/waves, m/s speeds) onto WEATHER_FIELDS"""
+        if any(field in record for field in WEATHER_FIELDS):
+            return record
+
+        # One Call responses nest the current conditions
+        if isinstance(record.get("current"), dict):
+            record = {**record, **record["current"]}
+
+        mapped = {}
+        wind = record.get("wind")
+        if isinstance(wind, dict):
+            if wind.get("speed") is not None:
+                mapped["wind_speed_kn"] = float(wind["speed"]) * MS_TO_KNOTS
+            if wind.get("deg") is not None:
+                mapped["wind_direction_deg"] = float(wind["deg"])
+        if record.get("wind_speed") is not None:
+            mapped["wind_speed_kn"] = float(record["wind_speed"]) * MS_TO_KNOTS
+        if record.get("wind_deg") is not None:
+            mapped["wind_direction_deg"] = float(record["wind_deg"])
+
+        waves = record.get("waves") or record.get("wave")
+        if isinstance(waves, dict):
+            if waves.get("height") is not None:
+                mapped["wave_height_m"] = float(waves["height"])
+            direction = waves.get("direction", waves.get("deg"))
+            if direction is not None:
+                mapped["wave_direction_deg"] = float(direction)
+        return mapped
+
+    def _recommendations(self, segments: List[Dict[str, Any]], max_risk: float) -> List[str]:
+        recommendations = []
+        risky = [s for s in segments if s["risk_score"] >= RISK_LEVELS[1][0]]
+        slow = [s for s in segments if s["speed_loss_pct"] >= 15.0]
+
+        if max_risk >= RISK_LEVELS[2][0]:
+            recommendations.append("Severe conditions on route - consider delaying departure or rerouting")
+        if risky:
+            recommendations.append(
+                "Reduce speed and adjust heading on segments "
+                + ", ".join(str(s["segment"]) for s in risky)
+            )
+        if slow:
+            recommendations.append(
+                "Expect significant speed loss on segments "
+                + ", ".join(str(s["segment"]) for s in slow)
+                + " - revise ETA with charterers"
+            )
+        if not recommendations:
+            recommendations.append("No significant weather impact expected - maintain planned speed")
+        return recommendations
\ No newline at end of file
@@ -0,0 +1,27 @@
+import asyncio
+import io
+import os
+import pytest
+from fastapi import UploadFile
+from backend.services.document_source import DocumentSource, UploadTooLarge
+
+
+def _upload(size_bytes: int) -> UploadFile:
+    # No declared size, as with chunked request bodies
+    return UploadFile(io.BytesIO(b"x" * size_bytes), filename="sof.pdf")
+
+
+def test_unsized_upload_over_limit_is_rejected_and_spill_removed(tmp_path):
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(DocumentSource.from_upload(_upload(3 * 1024 * 1024), str(tmp_path), 1024, 2 * 1024 * 1024))
+    assert os.listdir(tmp_path) == []
+
+
+def test_unsized_upload_within_limit_spills_to_disk(tmp_path):
+    source = asyncio.run(DocumentSource.from_upload(_upload(1536 * 1024), str(tmp_path), 1024, 2 * 1024 * 1024))
+    try:
+        assert not source.in_memory
+        assert source.size == 1536 * 1024
+    finally:
+        source.cleanup()
+    assert os.listdir(tmp_path) == []
\ No newline at end of file
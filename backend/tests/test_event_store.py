@@ -0,0 +1,16 @@
+from backend.services.event_store import EventColumns
+
+
+def test_supplied_duration_is_kept_as_int_only_without_end_time():
+    events = EventColumns.from_dicts([
+        {"event_name": "Waiting berth", "start_time_iso": "2024-03-01T06:00:00Z", "duration_minutes": 90.4},
+        {"event_name": "Shifting", "start_time_iso": "2024-03-01T08:00:00Z", "duration_minutes": "2 hrs"},
+        {
+            "event_name": "Loading",
+            "start_time_iso": "2024-03-01T09:00:00Z",
+            "end_time_iso": "2024-03-01T10:00:00Z",
+            "duration_minutes": 5
+        },
+    ])
+
+    assert [e["duration_minutes"] for e in events.to_dicts()] == [90, None, 60]
\ No newline at end of file
@@ -0,0 +1,80 @@
+import asyncio
+import json
+from aiohttp import web
+from backend.core.config import settings
+from backend.loadtest.stubs import StubServer, UpstreamProfile
+from backend.services import ai_service
+from backend.services.ai_service import AIService
+from backend.services.llm_scheduler import LLMScheduler, LocalRateLimiter
+
+# A fenced reply as a model streams it. Deltas split the fence, the middle of
+# string values, an escape sequence and a brace inside a string.
+DELTAS = [
+    "``",
+    "`json\n{\"ev",
+    "ents\": [{\"event_name\": \"NOR \\",
+    "\"tendered\\\" {pilot}\", \"start_time_iso\": \"2024-03-01T06:00:00Z\"}",
+    ", {\"event_name\": \"All fa",
+    "st\", \"start_time_iso\": \"2024-03-01T08:30:00Z\"}], \"anomalies\": [{\"description\": \"gap\"}]}\n`",
+    "``",
+]
+FIRST_EVENT_ENDS = 4
+
+
+class StubStreamingOpenRouter(StubServer):
+    """Streams DELTAS as SSE, holding the rest of the reply until released"""
+
+    def __init__(self):
+        super().__init__(UpstreamProfile())
+        self.release = asyncio.Event()
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/chat/completions", self._handle)
+        return app
+
+    async def _handle(self, request: web.Request):
+        return await self._respond(request, self._completion)
+
+    async def _completion(self, request: web.Request):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await response.write(b": keep-alive\n\n")
+        for i, delta in enumerate(DELTAS):
+            if i == FIRST_EVENT_ENDS:
+                await self.release.wait()
+            line = f"data: {json.dumps({'choices': [{'delta': {'content': delta}}]})}\n\n".encode("utf-8")
+            # Split the SSE line itself across network writes as well
+            middle = len(line) // 2
+            await response.write(line[:middle])
+            await asyncio.sleep(0)
+            await response.write(line[middle:])
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+
+def test_stream_sof_events_yields_events_incrementally(monkeypatch):
+    async def run():
+        stub = StubStreamingOpenRouter()
+        await stub.start()
+        monkeypatch.setattr(settings, "OPENROUTER_API_KEY", "test-key")
+        monkeypatch.setattr(settings, "OPENROUTER_BASE_URL", stub.base_url)
+        monkeypatch.setattr(ai_service, "llm_scheduler", LLMScheduler(LocalRateLimiter(600, 1000000)))
+        try:
+            stream = AIService().stream_sof_events("STATEMENT OF FACTS")
+            # The stub holds back the second event until released, so this only
+            # completes if the first event is parsed out of a partial reply
+            first = await asyncio.wait_for(stream.__anext__(), timeout=5)
+            stub.release.set()
+            rest = [item async for item in stream]
+        finally:
+            await stub.stop()
+        return [first] + rest
+
+    items = asyncio.run(run())
+
+    assert [item["type"] for item in items] == ["event", "event", "anomalies"]
+    assert items[0]["data"]["event_name"] == 'NOR "tendered" {pilot}'
+    assert items[1]["data"]["event_name"] == "All fast"
+    assert items[2]["data"] == [{"description": "gap"}]
\ No newline at end of file
@@ -0,0 +1,58 @@
+import asyncio
+from backend.services.ai_service import AIService
+from backend.services.template_merger import TemplateMerger
+
+TEMPLATE = """CHARTER PARTY
+
+1. Vessel Description
+The vessel is [VESSEL_NAME].
+
+2. Laytime
+Laytime as per recap.
+
+3. Demurrage
+Demurrage rate to be agreed.
+
+4. Ice Clause
+Vessel not to force ice.
+"""
+
+
+def _sections(merger: TemplateMerger):
+    return merger.index_sections(TEMPLATE)
+
+
+def test_match_section_prefers_title_over_list_number():
+    merger = TemplateMerger()
+    sections = _sections(merger)
+
+    def heading(clause):
+        section = merger.match_section(clause, sections)
+        return section and section["heading"]
+
+    assert heading("1. Demurrage: USD 15,000 per day pro rata") == "3. Demurrage"
+    assert heading("2. Ice: vessel may follow icebreakers") == "4. Ice Clause"
+    assert heading("3) Bunkers: as on delivery") is None
+    assert heading("4. Notice: NOR to be tendered in office hours") is None
+
+
+def test_match_section_uses_number_without_title():
+    merger = TemplateMerger()
+    sections = _sections(merger)
+
+    assert merger.match_section("Clause 2 to read 72 running hours SHINC", sections)["heading"] == "2. Laytime"
+    assert merger.match_section("9. to be deleted", sections) is None
+
+
+def test_generate_charter_party_lists_changes_in_section_order(monkeypatch):
+    async def integrate(self, section_text, clauses, cache_mode):
+        return section_text.rstrip() + "\n" + "\n".join(clauses) + "\n\n"
+
+    monkeypatch.setattr(AIService, "_integrate_clauses", integrate)
+    clauses = "1. Ice: vessel may follow icebreakers\n\n2. Demurrage: USD 15,000 per day"
+    result = asyncio.run(AIService().generate_charter_party({"vessel_name": "MV Test"}, clauses, TEMPLATE))
+
+    fields = [change["field"] for change in result["changes"] if change["source"] == "negotiated_clauses"]
+    assert fields == ["Clause 3", "Clause 4"]
+    assert "USD 15,000" in result["content"].split("4. Ice Clause")[0]
+    assert "icebreakers" in result["content"].split("4. Ice Clause")[1]
\ No newline at end of file